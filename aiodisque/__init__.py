@@ -1,14 +1,42 @@
+from .acks import *
+from .blobs import *
+from .breakers import *
+from .chunks import *
 from .client import *
+from .codecs import *
+from .cluster import *
 from .connections import *
+from .dedup import *
+from .deferred import *
+from .envelopes import *
 from .iterators import *
+from .limiters import *
+from .monitors import *
+from .outbox import *
 from .queues import *
+from .replication import *
 from .scanners import *
+from .schedulers import *
 
-__all__ = (client.__all__ +
+__all__ = (acks.__all__ +
+           blobs.__all__ +
+           breakers.__all__ +
+           chunks.__all__ +
+           client.__all__ +
+           codecs.__all__ +
+           cluster.__all__ +
            connections.__all__ +
+           dedup.__all__ +
+           deferred.__all__ +
+           envelopes.__all__ +
            iterators.__all__ +
+           limiters.__all__ +
+           monitors.__all__ +
+           outbox.__all__ +
            queues.__all__ +
-           scanners.__all__)
+           replication.__all__ +
+           scanners.__all__ +
+           schedulers.__all__)
 
 from ._version import get_versions
 __version__ = get_versions()['version']
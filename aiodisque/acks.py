@@ -0,0 +1,66 @@
+import asyncio
+from .util import Batcher
+
+__all__ = ['AckBatcher']
+
+
+class AckBatcher(Batcher):
+    """Coalesces the acknowledges of many coroutines
+
+    Jobs acknowledged by :meth:`ack` are buffered, and acknowledged by a
+    single ACKJOB, or FASTACK with ``fast``, once ``max_size`` jobs are
+    buffered, ``max_delay`` seconds after the first one, or on
+    :meth:`flush`. Every caller gets the reply of the shared command::
+
+        batcher = AckBatcher(client, max_delay=0.002)
+        await batcher.ack(job)
+        await batcher.close()
+
+    Parameters:
+        client (Disque): disque client
+        fast (bool): use FASTACK instead of ACKJOB
+        max_size (int): maximum number of jobs of a command
+        max_delay (float): maximum seconds a job is buffered
+        loop (EventLoop): asyncio loop
+
+    Attributes:
+        commands (int): number of commands sent
+        acked (int): number of jobs acknowledged
+    """
+
+    def __init__(self, client, *, fast=False, max_size=500, max_delay=0.002,
+                 loop=None):
+        super().__init__(max_delay=max_delay, loop=loop)
+        self.client = client
+        self.fast = fast
+        self.max_size = max_size
+        self.commands = 0
+        self.acked = 0
+
+    def ack_nowait(self, job):
+        """Buffers the acknowledge of a job
+
+        Parameters:
+            job (Job): a :class:`Job` or job id
+        Returns:
+            Future: the reply of the command that acknowledged it
+        """
+        return self.push(job)
+
+    async def ack(self, job):
+        """Acknowledges a job with the others of the batch
+
+        Returns:
+            int: the total of really acknowledged jobs of the batch
+        """
+        return await asyncio.shield(self.ack_nowait(job))
+
+    def full(self, count, size):
+        return count >= self.max_size
+
+    async def process(self, jobs):
+        method = self.client.fastack if self.fast else self.client.ackjob
+        response = await method(*jobs)
+        self.commands += 1
+        self.acked += len(jobs)
+        return response
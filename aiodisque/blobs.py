@@ -0,0 +1,191 @@
+import asyncio
+import os
+import os.path
+import re
+import uuid
+
+__all__ = ['BlobStore', 'FileBlobStore', 'BlobReference']
+
+#: header of the bodies that refer to a blob
+MARKER = b'\xbfR'
+
+_file_key = re.compile('[0-9a-f]{32}')
+
+
+def is_reference(body):
+    """Tells if body refers to a blob
+    """
+    if isinstance(body, str):
+        return body[:2] == '\udcbfR'
+    return body[:2] == MARKER
+
+
+def reference_key(body):
+    """Returns the key of the blob a body refers to
+    """
+    if isinstance(body, str):
+        return body[2:]
+    return body[2:].decode('utf-8', 'surrogateescape')
+
+
+class BlobStore:
+    """Stores the large bodies of jobs out of the cluster
+
+    Disque keeps every job in memory, on every node it is replicated to.
+    Bodies larger than ``threshold`` bytes are put into the store, and the
+    job only carries a small reference to the blob::
+
+        client = Disque(address, blobs=FileBlobStore('/mnt/shared/blobs'))
+
+    Consumers must share the store with producers. Subclasses implement
+    :meth:`put`, :meth:`get` and :meth:`delete`.
+
+    Parameters:
+        threshold (int): size in bytes above which bodies are offloaded
+    """
+
+    def __init__(self, *, threshold=2 ** 20):
+        self.threshold = threshold
+
+    async def put(self, data):
+        """Stores data, and returns its key
+        """
+        raise NotImplementedError
+
+    async def get(self, key):
+        """Returns the data of a key
+        """
+        raise NotImplementedError
+
+    async def delete(self, key):
+        """Deletes the data of a key
+        """
+        raise NotImplementedError
+
+    def valid_key(self, key):
+        """Tells if key could have been returned by :meth:`put`
+
+        Keys are read from job bodies, which anyone can add. Bodies that
+        refer to invalid keys are left as they are.
+        """
+        return True
+
+    def offloads(self, body):
+        """Tells if body must be offloaded
+
+        A body that already refers to a blob is never offloaded again.
+        """
+        return len(body) > self.threshold and not is_reference(body)
+
+    async def offload(self, body):
+        """Stores body, and returns the body that refers to it
+        """
+        if isinstance(body, str):
+            body = body.encode('utf-8', 'surrogateescape')
+        key = await self.put(body)
+        return MARKER + key.encode('utf-8')
+
+
+class FileBlobStore(BlobStore):
+    """Stores blobs as files of a directory
+
+    Files are written and read in ``executor``, or in the default executor
+    of the loop, so that large blobs do not block the loop. Keys are
+    random hexadecimal names, and no other key is accepted, so that a job
+    cannot refer to a file out of the directory.
+
+    Parameters:
+        directory (str): path of the directory, created if needed
+        threshold (int): size in bytes above which bodies are offloaded
+        executor (Executor): executor of the file operations
+        loop (EventLoop): asyncio loop
+    """
+
+    def __init__(self, directory, *, threshold=2 ** 20, executor=None,
+                 loop=None):
+        super().__init__(threshold=threshold)
+        self.directory = directory
+        self.executor = executor
+        self.loop = loop
+        os.makedirs(directory, exist_ok=True)
+
+    def _run(self, func, *args):
+        loop = self.loop or asyncio.get_event_loop()
+        return loop.run_in_executor(self.executor, func, *args)
+
+    def valid_key(self, key):
+        return _file_key.fullmatch(key) is not None
+
+    def _path(self, key):
+        if not self.valid_key(key):
+            raise ValueError('invalid blob key %r' % key)
+        return os.path.join(self.directory, key)
+
+    async def put(self, data):
+        key = uuid.uuid4().hex
+        await self._run(self._write, self._path(key), data)
+        return key
+
+    async def get(self, key):
+        return await self._run(self._read, self._path(key))
+
+    async def delete(self, key):
+        await self._run(self._remove, self._path(key))
+
+    @staticmethod
+    def _write(path, data):
+        with open(path + '.tmp', 'wb') as file:
+            file.write(data)
+        os.replace(path + '.tmp', path)
+
+    @staticmethod
+    def _read(path):
+        with open(path, 'rb') as file:
+            return file.read()
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class BlobReference:
+    """Body of a job whose body has been offloaded
+
+    The blob is only read by :meth:`read`, and decoded with ``codec``.
+    Acknowledging the job with :meth:`Disque.ackjob` or
+    :meth:`Disque.fastack` deletes the blob.
+
+    Attributes:
+        store (BlobStore): store of the blob
+        key (str): key of the blob
+        codec (Codec): decodes the body
+    """
+
+    def __init__(self, store, key, codec=None):
+        self.store = store
+        self.key = key
+        self.codec = codec
+        self._body = None
+        self._read = False
+
+    async def read(self):
+        """Reads and decodes the body, once
+        """
+        if not self._read:
+            data = await self.store.get(self.key)
+            body = data.decode('utf-8', 'surrogateescape')
+            if self.codec:
+                body, = await self.codec.decode_many([body])
+            self._body, self._read = body, True
+        return self._body
+
+    async def delete(self):
+        """Deletes the blob
+        """
+        await self.store.delete(self.key)
+
+    def __repr__(self):
+        return '<BlobReference(key=%r)>' % self.key
@@ -0,0 +1,142 @@
+import asyncio
+from collections import deque
+from .connections import ConnectionError, ClosedConnectionError, ProtocolError
+
+__all__ = ['CircuitBreaker', 'CircuitOpenError']
+
+
+class CircuitOpenError(ConnectionError):
+    """
+    Exception raised when a command is refused by an open
+    :class:`CircuitBreaker`.
+    """
+
+
+class CircuitBreaker:
+    """Stops sending commands to a node that keeps failing
+
+    The breaker is ``closed`` while the node behaves. It becomes ``open``
+    when the rate of failures of the last ``window`` commands exceeds
+    ``error_rate``. Commands slower than ``latency`` are cancelled with
+    :class:`asyncio.TimeoutError`, and count as failures.
+    While the breaker is open, commands are refused with
+    :class:`CircuitOpenError`.
+
+    After ``reset_timeout`` seconds, the breaker becomes ``half-open``, and
+    lets one probe pass every ``probe_interval`` seconds. A successful probe
+    closes the breaker, a failed one opens it again.
+
+    Parameters:
+        error_rate (float): rate of failures that opens the breaker
+        window (int): number of commands the rate is computed on
+        min_calls (int): number of commands required to compute the rate
+        latency (float): number of seconds after which a command is cancelled
+        reset_timeout (float): number of seconds the breaker stays open
+        probe_interval (float): number of seconds between two probes
+        loop (EventLoop): asyncio loop
+    """
+
+    #: exceptions that are failures of the node
+    failures = (ClosedConnectionError, ProtocolError, OSError,
+                asyncio.TimeoutError)
+
+    def __init__(self, *, error_rate=0.5, window=20, min_calls=5,
+                 latency=None, reset_timeout=5, probe_interval=1, loop=None):
+        self.error_rate = error_rate
+        self.min_calls = min_calls
+        self.latency = latency
+        self.reset_timeout = reset_timeout
+        self.probe_interval = probe_interval
+        self.loop = loop
+        self.opened_at = None
+        self.probed_at = None
+        self.trips = 0
+        self._results = deque(maxlen=window)
+
+    @property
+    def _loop(self):
+        return self.loop or asyncio.get_event_loop()
+
+    @property
+    def state(self):
+        """One of ``closed``, ``open`` or ``half-open``
+        """
+        if self.opened_at is None:
+            return 'closed'
+        if self._loop.time() - self.opened_at < self.reset_timeout:
+            return 'open'
+        return 'half-open'
+
+    def ready(self):
+        """Tells if a command would be allowed, without consuming a probe
+        """
+        state = self.state
+        if state == 'half-open':
+            return self.probed_at is None or \
+                self._loop.time() - self.probed_at >= self.probe_interval
+        return state == 'closed'
+
+    def allow(self):
+        """Tells if a command can be sent, and consumes a probe if needed
+        """
+        if not self.ready():
+            return False
+        if self.state == 'half-open':
+            self.probed_at = self._loop.time()
+        return True
+
+    def record(self, elapsed, failed=False):
+        """Records the outcome of a command
+
+        Parameters:
+            elapsed (float): number of seconds the command took
+            failed (bool): the command failed
+        """
+        if self.latency is not None and elapsed > self.latency:
+            failed = True
+        if self.state == 'open':
+            return
+        if self.state == 'half-open':
+            if failed:
+                self.trip()
+            else:
+                self.reset()
+            return
+        self._results.append(failed)
+        if len(self._results) >= self.min_calls:
+            rate = sum(self._results) / len(self._results)
+            if rate >= self.error_rate:
+                self.trip()
+
+    def trip(self):
+        """Opens the breaker
+        """
+        self.opened_at = self._loop.time()
+        self.probed_at = None
+        self.trips += 1
+
+    def reset(self):
+        """Closes the breaker
+        """
+        self.opened_at = None
+        self.probed_at = None
+        self._results.clear()
+
+    async def call(self, func, *args, **kwargs):
+        """Calls the coroutine func thru the breaker
+
+        Raises:
+            CircuitOpenError: the breaker does not allow the call
+            asyncio.TimeoutError: the call took longer than ``latency``
+        """
+        if not self.allow():
+            raise CircuitOpenError('circuit breaker is %s' % self.state)
+        started = self._loop.time()
+        try:
+            response = await asyncio.wait_for(func(*args, **kwargs),
+                                              self.latency)
+        except self.failures:
+            self.record(self._loop.time() - started, failed=True)
+            raise
+        self.record(self._loop.time() - started)
+        return response
@@ -0,0 +1,122 @@
+__all__ = ['ChunkAssembler']
+
+#: header of the bodies that are chunks of a larger body
+MARKER = b'\xbfC'
+
+
+def chunk_queue(queue, group):
+    """Returns the queue of the tail chunks of a group
+    """
+    return '%s:chunks:%s' % (queue, group)
+
+
+def encode_chunks(body, group, size):
+    """Splits an encoded body into chunks of size bytes
+
+    Every chunk carries the group id, its sequence number and the total
+    number of chunks.
+    """
+    if isinstance(body, str):
+        body = body.encode('utf-8', 'surrogateescape')
+    parts = [body[i:i + size] for i in range(0, len(body), size)]
+    header = MARKER + group.encode('utf-8')
+    return [header + b'%d/%d:' % (seq, len(parts)) + part
+            for seq, part in enumerate(parts)]
+
+
+def is_chunk(body):
+    """Tells if body is a chunk
+    """
+    if isinstance(body, str):
+        return body[:2] == '\udcbfC'
+    return body[:2] == MARKER
+
+
+def parse_chunk(body):
+    """Returns the group, sequence, total and data of a chunk
+    """
+    if isinstance(body, str):
+        body = body.encode('utf-8', 'surrogateescape')
+    index = body.index(b':', 2)
+    group = body[2:34].decode('utf-8')
+    seq, total = body[34:index].split(b'/')
+    return group, int(seq), int(total), body[index + 1:]
+
+
+class ChunkAssembler:
+    """Gathers the chunks added by :meth:`Disque.addjob_chunked`
+
+    The first chunk of a body is added to the queue, and the others to a
+    queue of their own, named after the group. Once the first chunk is
+    fetched, the others are fetched by batches from the group queue, and
+    the body is reassembled and decoded::
+
+        assembler = ChunkAssembler(client, 'q')
+        job = await assembler.get()
+        await client.ackjob(job)
+
+    Jobs that are not chunked are returned as they are. The job returned
+    for a chunked body is the first chunk, with every chunk into its
+    ``chunks`` attribute, so that :meth:`Disque.ackjob` acknowledges them
+    as a unit. When the group is not complete after ``timeout``, its
+    chunks are nacked, in order to be delivered again.
+
+    Parameters:
+        client (Disque): disque client
+        queue (str): name of the queue
+        timeout (int): milliseconds to wait for the missing chunks
+        codec (Codec): decodes the bodies instead of the codec of the
+                       client
+
+    Attributes:
+        assembled (int): number of bodies reassembled
+        incomplete (int): number of groups nacked on timeout
+    """
+
+    def __init__(self, client, queue, *, timeout=5000, codec=None):
+        self.client = client
+        self.queue = queue
+        self.timeout = timeout
+        self.codec = codec
+        self.assembled = 0
+        self.incomplete = 0
+
+    async def get(self):
+        """Returns the next job of the queue, reassembled if needed
+        """
+        while True:
+            job = await self.client.getjob(self.queue, codec=False)
+            if is_chunk(job.body):
+                job = await self.assemble(job)
+            else:
+                await self.client.decode_jobs([job], self.codec)
+            if job is not None:
+                return job
+
+    async def assemble(self, head):
+        """Fetches the chunks that follow head, and reassembles the body
+
+        Returns:
+            Job: the reassembled job, or None on timeout
+        """
+        group, seq, total, data = parse_chunk(head.body)
+        chunks, parts = [head], {seq: data}
+        while len(parts) < total:
+            jobs = await self.client.getjob(chunk_queue(self.queue, group),
+                                            timeout=self.timeout,
+                                            count=total - len(parts),
+                                            codec=False)
+            if jobs is None:
+                await self.client.nack(*chunks)
+                self.incomplete += 1
+                return None
+            for job in jobs:
+                seq, data = parse_chunk(job.body)[1::2]
+                parts[seq] = data
+            chunks.extend(jobs)
+        body = b''.join(parts[seq] for seq in range(total))
+        head.body = body.decode('utf-8', 'surrogateescape')
+        head.group, head.chunks = group, chunks
+        await self.client.decode_jobs([head], self.codec)
+        self.assembled += 1
+        return head
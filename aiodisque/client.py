@@ -1,10 +1,16 @@
-from .connections import connect, ClosedConnectionError
+from .blobs import BlobReference, is_reference, reference_key
+from .chunks import chunk_queue, encode_chunks
+from .deferred import DeferredCommands
+from .connections import connect, ConnectionError, ClosedConnectionError
 from .iterators import JobsIterator
 from .scanners import JobsScanner, QueuesScanner
-from .util import grouper
-from collections import namedtuple
+from .util import grouper, parse_address, is_local_address
+from .util import encode_command, encode_arguments, CommandTemplate
+from collections import namedtuple, OrderedDict
+import os.path
+import uuid
 
-__all__ = ['Disque', 'Job', 'Cursor']
+__all__ = ['Disque', 'Job', 'JobProfile', 'Cursor']
 
 
 class Cursor(namedtuple('_Cursor', 'cursor, items')):
@@ -43,6 +49,84 @@ class Job:
                                                     self.body)
 
 
+def addjob_options(*, replicate=None, delay=None, retry=None, ttl=None,
+                   maxlen=None, asynchronous=False):
+    params = []
+    if replicate is not None:
+        params.extend(('REPLICATE', replicate))
+    if delay is not None:
+        params.extend(('DELAY', delay))
+    if retry is not None:
+        params.extend(('RETRY', retry))
+    if ttl is not None:
+        params.extend(('TTL', ttl))
+    if maxlen is not None:
+        params.extend(('MAXLEN', maxlen))
+    if asynchronous is True:
+        params.append('ASYNC')
+    return params
+
+
+def encode_addjobs(jobs, ms_timeout, options):
+    """Encodes ADDJOB commands that share the same options
+
+    Parameters:
+        jobs (list): list of ``(queue, body)`` pairs, where body is
+                     already encoded with :func:`encode_arguments`
+        ms_timeout (int): the command timeout in milliseconds
+        options (list): options returned by :func:`addjob_options`
+    Returns:
+        list: the encoded commands
+    """
+    header = b'*%d\r\n' % (len(options) + 4) + encode_arguments('ADDJOB')
+    suffix = encode_arguments(ms_timeout, *options)
+    prefixes = {}
+    messages = []
+    for queue, body in jobs:
+        if queue not in prefixes:
+            prefixes[queue] = header + encode_arguments(queue)
+        messages.append(prefixes[queue] + body + suffix)
+    return messages
+
+
+class JobProfile(CommandTemplate):
+    """Pre-encoded ADDJOB command of a queue
+
+    Only the job body is encoded at each call. It accepts the same options
+    than :meth:`Disque.addjob`.
+
+    Attributes:
+        queue (str): the queue name
+        ms_timeout (int): the command timeout in milliseconds
+        options (dict): the options of the profile
+    """
+
+    def __init__(self, queue, ms_timeout=0, *, replicate=None, delay=None,
+                 retry=None, ttl=None, maxlen=None, asynchronous=False):
+        self.options = dict(replicate=replicate, delay=delay, retry=retry,
+                            ttl=ttl, maxlen=maxlen, asynchronous=asynchronous)
+        options = addjob_options(**self.options)
+        super().__init__('ADDJOB', queue, suffix=[ms_timeout] + options)
+        self.queue = queue
+        self.ms_timeout = ms_timeout
+
+
+ADDJOB = CommandTemplate('ADDJOB')
+ACKJOB = CommandTemplate('ACKJOB')
+FASTACK = CommandTemplate('FASTACK')
+NACK = CommandTemplate('NACK')
+
+
+def job_ids(jobs):
+    """Returns the ids of jobs, expanding the chunks of reassembled jobs
+    """
+    ids = []
+    for job in jobs:
+        for chunk in getattr(job, 'chunks', None) or [job]:
+            ids.append(getattr(chunk, 'id', chunk))
+    return ids
+
+
 def render_jobs(response):
     result = []
     for res in response:
@@ -61,22 +145,76 @@ class Disque:
         client = Disque(address=('127.0.0.1', 7711))
         client = Disque(address='/path/to/socket')
 
+    With ``prefer_unix``, a tcp address that points to the local host is
+    exchanged for the unix socket of the same node. The socket is either
+    ``unix_socket``, or discovered with ``CONFIG GET unixsocket``. The tcp
+    address is still used when the socket is not available.
+
     Parameters:
         client (Address): a tcp or unix address
         loop (EventLoop): asyncio loop
         auto_reconnect (bool): automatically reconnect after connection lost
+        prefer_unix (bool): use the unix socket of co-located nodes
+        unix_socket (str): path of the unix socket of the local node
+        breaker (CircuitBreaker): refuse commands while the node is failing
+        high_water (int): size in bytes of the write buffer above which
+                          commands wait for it to be drained
+        low_water (int): size in bytes of the write buffer below which
+                         commands are sent again
+        admission (MemoryMonitor): throttles the jobs added
+        producer_limiter (TokenBucket): caps the rate of jobs added
+        consumer_limiter (TokenBucket): caps the rate of jobs fetched
+        replication (ReplicationPolicy): relaxes the replication of jobs
+                                         while ADDJOB is too slow
+        codec (Codec): encodes the bodies of jobs added, and decodes the
+                       bodies of jobs fetched
+        blobs (BlobStore): offloads the large bodies of jobs added
+        dedup (DedupWindow): skips the jobs added twice by :meth:`addjob`,
+                             when asked by the caller
+        max_in_flight (int): maximum number of commands sent with
+                             ``wait=False`` waiting for their replies
+        on_error (callable): called with the error and the arguments of
+                             the commands sent with ``wait=False`` that
+                             failed
+
+    Attributes:
+        deferred (DeferredCommands): the commands sent with ``wait=False``
     """
 
-    def __init__(self, address, *, auto_reconnect=None, loop=None):
+    def __init__(self, address, *, auto_reconnect=None, loop=None,
+                 prefer_unix=None, unix_socket=None, breaker=None,
+                 high_water=None, low_water=None, admission=None,
+                 producer_limiter=None, consumer_limiter=None,
+                 replication=None, codec=None, blobs=None, dedup=None,
+                 max_in_flight=1024, on_error=None):
         self.address = address
         self.loop = loop
         self.auto_reconnect = auto_reconnect
+        self.prefer_unix = prefer_unix
+        self.unix_socket = unix_socket
+        self.breaker = breaker
+        self.high_water = high_water
+        self.low_water = low_water
+        self.admission = admission
+        self.producer_limiter = producer_limiter
+        self.consumer_limiter = consumer_limiter
+        self.replication = replication
+        self.codec = codec
+        self.blobs = blobs
+        self.dedup = dedup
+        self.deferred = DeferredCommands(self, max_in_flight=max_in_flight,
+                                         on_error=on_error, loop=loop)
+        self.profiles = {}
+        self._templates = {}
+        self._watchers = {}
         self._connection = None
+        self._blocking_connection = None
         self._closed = False
 
     async def addjob(self, queue, job, ms_timeout=0, *, replicate=None,
                      delay=None, retry=None, ttl=None,
-                     maxlen=None, asynchronous=False):
+                     maxlen=None, asynchronous=False, codec=None,
+                     idempotency_key=None, dedup=False, wait=True):
         """Adds a job to the specified queue
 
         The command returns the Job ID of the added job, assuming
@@ -121,28 +259,283 @@ class Disque:
                                  The job gets queued asynchronous, while
                                  normally the job is put into the queue only
                                  when the client gets a positive reply.
+            codec (Codec): encodes the job instead of the codec of the
+                           client. ``False`` sends the job as is
+            idempotency_key (str): identifies the job for the dedup window
+                                   of the client, instead of its body
+            dedup (bool): skips the job if the dedup window of the client
+                          already holds the same body for this queue.
+                          Jobs are only deduplicated when this, or
+                          ``idempotency_key``, is given
+            wait (bool): with ``asynchronous``, ``False`` returns once the
+                         command is buffered, without waiting for its reply.
+                         Errors are reported by :attr:`deferred`, and
+                         such jobs are not deduplicated
 
         Returns:
-            A ``str`` representing the id of the added job
-        """
-        params = ['ADDJOB', queue, getattr(job, 'body', job), ms_timeout]
-        if replicate is not None:
-            params.extend(('REPLICATE', replicate))
-        if delay is not None:
-            params.extend(('DELAY', delay))
-        if retry is not None:
-            params.extend(('RETRY', retry))
-        if ttl is not None:
-            params.extend(('TTL', ttl))
-        if maxlen is not None:
-            params.extend(('MAXLEN', maxlen))
-        if asynchronous is True:
-            params.append('ASYNC')
-        response = await self.execute_command(*params)
-        return response
+            A ``str`` representing the id of the added job, or None when
+            not waiting for it
+        """
+        assert wait or asynchronous, 'wait=False requires asynchronous'
+        options = dict(replicate=replicate, delay=delay, retry=retry,
+                       ttl=ttl, maxlen=maxlen, asynchronous=asynchronous)
+        body = self._encode_body(job, codec)
+        deduplicate = dedup or idempotency_key is not None
+        if self.dedup is None or not deduplicate or not wait:
+            return await self._addjob(queue, body, ms_timeout, options,
+                                      wait)
+        key = self.dedup.key(queue, body, idempotency_key)
+        return await self.dedup.call(key, self._addjob, queue, body,
+                                     ms_timeout, options)
+
+    async def _addjob(self, queue, body, ms_timeout, options, wait=True):
+        offloaded = await self._offload_body(body)
+        if offloaded is body:
+            return await self._send_addjob(queue, body, ms_timeout, options,
+                                           wait)
+        try:
+            return await self._send_addjob(
+                queue, offloaded, ms_timeout, options, wait,
+                otherwise=lambda: self._discard_blobs([offloaded]))
+        except Exception:
+            await self._discard_blobs([offloaded])
+            raise
+
+    async def _send_addjob(self, queue, body, ms_timeout, options, wait,
+                           otherwise=None):
+        profile = self.profiles.get(queue)
+        if profile and not addjob_options(**options) and not ms_timeout:
+            options, ms_timeout = dict(profile.options), profile.ms_timeout
+        policy = self._adapt_replication(queue, options)
+        if profile and options == profile.options and \
+                ms_timeout == profile.ms_timeout:
+            template, values = profile, (body,)
+        else:
+            template, values = ADDJOB, (queue, body, ms_timeout) + tuple(
+                addjob_options(**options))
+        await self._admit(1, len(body))
+        if not wait:
+            return await self.deferred.send(template, *values,
+                                            otherwise=otherwise)
+        coro = self.execute_template(template, *values)
+        if policy is not None:
+            return await policy.measure(coro)
+        return await coro
+
+    def _adapt_replication(self, queue, options):
+        # returns the policy when the job is added as asked, so that its
+        # latency is measured, or adapts the options of a degraded job
+        policy = self.replication
+        if policy is None or options['asynchronous']:
+            return None
+        adapted = policy.adapt(queue, options['replicate'])
+        if adapted == (options['replicate'], False):
+            return policy
+        options['replicate'], options['asynchronous'] = adapted
+
+    def register_profile(self, queue, ms_timeout=0, *, replicate=None,
+                         delay=None, retry=None, ttl=None, maxlen=None,
+                         asynchronous=False):
+        """Registers the default options of the jobs of a queue
+
+        The ADDJOB command is encoded once with these options. Then, the jobs
+        added to this queue without any option use the profile, and only
+        their body is encoded. It accepts the same options than
+        :meth:`~Disque.addjob`.
+
+        Parameters:
+            queue (str): name of the queue
+        Returns:
+            JobProfile
+        """
+        profile = JobProfile(queue, ms_timeout, replicate=replicate,
+                             delay=delay, retry=retry, ttl=ttl,
+                             maxlen=maxlen, asynchronous=asynchronous)
+        self.profiles[queue] = profile
+        return profile
+
+    async def addjob_many(self, queue, jobs, ms_timeout=0, *, replicate=None,
+                          delay=None, retry=None, ttl=None, maxlen=None,
+                          asynchronous=False, window=1000, codec=None):
+        """Adds many jobs to the specified queue
+
+        Commands are pipelined, by batches of ``window`` commands. It accepts
+        the same options than :meth:`~Disque.addjob`, which are shared by
+        every job. When a batch cannot be sent, the connection error is
+        reported in place of each of its jobs, and the next batches are
+        still sent.
+
+        Parameters:
+            queue (str): name of the queue
+            jobs (list): list of :class:`Job` or bodies
+            window (int): maximum number of commands sent at once
+        Returns:
+            list: the id of every job, or the error that refused it, in the
+                  order of ``jobs``
+        """
+        return await self.addjob_multi(
+            ((queue, job) for job in jobs), ms_timeout,
+            replicate=replicate, delay=delay, retry=retry, ttl=ttl,
+            maxlen=maxlen, asynchronous=asynchronous, window=window,
+            codec=codec)
+
+    async def addjob_multi(self, jobs, ms_timeout=0, *, replicate=None,
+                           delay=None, retry=None, ttl=None, maxlen=None,
+                           asynchronous=False, window=1000, codec=None):
+        """Adds many jobs to many queues
+
+        Same as :meth:`~Disque.addjob_many`, except that ``jobs`` is a list
+        of ``(queue, job)`` pairs.
+
+        Parameters:
+            jobs (list): list of ``(queue, job)`` pairs
+            window (int): maximum number of commands sent at once
+        Returns:
+            list: the id of every job, or the error that refused it, in the
+                  order of ``jobs``
+        """
+        options = addjob_options(replicate=replicate, delay=delay,
+                                 retry=retry, ttl=ttl, maxlen=maxlen,
+                                 asynchronous=asynchronous)
+        queues, bodies, blobs = [], [], {}
+        for index, (queue, job) in enumerate(jobs):
+            body = self._encode_body(job, codec)
+            offloaded = await self._offload_body(body)
+            if offloaded is not body:
+                blobs[index] = offloaded
+            queues.append(queue)
+            bodies.append(encode_arguments(offloaded))
+        messages = encode_addjobs(zip(queues, bodies), ms_timeout, options)
+        try:
+            await self._admit(len(messages), sum(len(msg) for msg in messages))
+        except Exception:
+            await self._discard_blobs(blobs.values())
+            raise
+        # errors are reported per job, the blobs of added jobs are kept
+        responses = await self._execute_addjobs(queues, messages, window)
+        await self._discard_blobs(blob for index, blob in blobs.items()
+                                  if isinstance(responses[index], Exception))
+        return responses
+
+    async def addjob_chunked(self, queue, job, ms_timeout=0, *,
+                             chunk_size=2 ** 18, replicate=None, delay=None,
+                             retry=None, ttl=None, maxlen=None,
+                             asynchronous=False, window=1000, codec=None):
+        """Adds a large job as many chunks
+
+        The encoded body is split into chunks of ``chunk_size`` bytes, that
+        carry a group id and their sequence number. The first chunk is added
+        to queue, and the others to a queue of their own, before it. Use a
+        :class:`ChunkAssembler` to fetch and reassemble them. A body that
+        fits into one chunk is added as is. It accepts the same options
+        than :meth:`~Disque.addjob`.
+
+        Parameters:
+            queue (str): name of the queue
+            job (Job): string representing the job
+            chunk_size (int): maximum size of a chunk, in bytes
+            window (int): maximum number of commands sent at once
+        Returns:
+            list: the ids of the chunks, the first one being in queue
+        Raises:
+            ConnectionError: a chunk has been refused. The chunks already
+                             added are deleted from the cluster
+        """
+        options = addjob_options(replicate=replicate, delay=delay,
+                                 retry=retry, ttl=ttl, maxlen=maxlen,
+                                 asynchronous=asynchronous)
+        body = self._encode_body(job, codec)
+        if len(body) <= chunk_size:
+            chunks, group = [encode_arguments(body)], None
+        else:
+            group = uuid.uuid4().hex
+            chunks = [encode_arguments(chunk)
+                      for chunk in encode_chunks(body, group, chunk_size)]
+        queues = [queue] + [chunk_queue(queue, group)] * (len(chunks) - 1)
+        jobs = list(zip(queues, chunks))
+        ids = []
+        if len(jobs) > 1:
+            ids = await self._send_addjobs(queues[1:], encode_addjobs(
+                jobs[1:], ms_timeout, options), window)
+        errors = [id for id in ids if isinstance(id, Exception)]
+        if not errors:
+            ids[:0] = await self._send_addjobs(queues[:1], encode_addjobs(
+                jobs[:1], ms_timeout, options), window)
+            errors = [id for id in ids[:1] if isinstance(id, Exception)]
+        if errors:
+            added = [id for id in ids if not isinstance(id, Exception)]
+            if added:
+                # DELJOB only deletes the copies of the node it is sent to
+                await self.fastack(*added)
+            raise errors[0]
+        return ids
+
+    async def publish(self, job, queues, ms_timeout=0, *, replicate=None,
+                      delay=None, retry=None, ttl=None, maxlen=None,
+                      asynchronous=False, window=1000, codec=None):
+        """Adds the same job to many queues
+
+        The body is encoded once, and commands are pipelined. It accepts the
+        same options than :meth:`~Disque.addjob`. The body is never
+        offloaded to the blob store, as every queue would share the blob.
+
+        Parameters:
+            job (Job): string representing the job
+            queues (list): names of the queues
+            window (int): maximum number of commands sent at once
+        Returns:
+            dict: the id of the added job, or the error that refused it,
+                  indexed by queue name
+        """
+        options = addjob_options(replicate=replicate, delay=delay,
+                                 retry=retry, ttl=ttl, maxlen=maxlen,
+                                 asynchronous=asynchronous)
+        body = encode_arguments(self._encode_body(job, codec))
+        queues = list(OrderedDict.fromkeys(queues))
+        messages = encode_addjobs([(queue, body) for queue in queues],
+                                  ms_timeout, options)
+        responses = await self._send_addjobs(queues, messages, window)
+        return dict(zip(queues, responses))
+
+    def _encode_body(self, job, codec=None):
+        body = getattr(job, 'body', job)
+        codec = self.codec if codec is None else codec
+        return codec.encode(body) if codec else body
+
+    async def _offload_body(self, body):
+        if self.blobs is not None and self.blobs.offloads(body):
+            body = await self.blobs.offload(body)
+        return body
+
+    async def _discard_blobs(self, bodies):
+        # deletes the blobs of offloaded bodies whose ADDJOB failed
+        for body in bodies:
+            await self.blobs.delete(reference_key(body))
+
+    async def _admit(self, count, size):
+        if self.admission is not None:
+            await self.admission.admit(size)
+        if self.producer_limiter is not None:
+            weight = self.producer_limiter.weight(count, size)
+            await self.producer_limiter.acquire(weight)
+
+    async def _send_addjobs(self, queues, messages, window):
+        await self._admit(len(messages), sum(len(msg) for msg in messages))
+        return await self._execute_addjobs(queues, messages, window)
+
+    async def _execute_addjobs(self, queues, messages, window):
+        responses = []
+        for i in range(0, len(messages), window):
+            batch = messages[i:i + window]
+            try:
+                results = await self.execute_messages(batch)
+            except (ConnectionError, OSError) as error:
+                results = [error] * len(batch)
+            responses.extend(results)
+        return responses
 
     async def getjob(self, *queues, nohang=None, timeout=None, count=None,
-                     withcounters=None):
+                     withcounters=None, codec=None):
         """Return jobs available in one of the specified queues
 
         If there are no jobs for the specified queues the command blocks, and
@@ -158,30 +551,74 @@ class Disque:
                                  acknowledges received by this job,
                                  and the number of additional deliveries
                                  performed for this job
+            codec (Codec): decodes the jobs instead of the codec of the
+                           client. ``False`` returns the bodies as is
             *queues: list of queue names, with one required
         Returns:
             It returns a single :class:`Job` if ``count`` is empty,
             None if ``timeout`` is reached, a list otherwise.
         """
         assert queues, 'At least one queue required'
-        params = ['GETJOB']
-        if nohang is True:
-            params.append('NOHANG')
-        if timeout is not None:
-            params.extend(('TIMEOUT', timeout))
-        if count is not None:
-            params.extend(('COUNT', count))
-        if withcounters is not None:
-            params.append('WITHCOUNTERS')
-        params.append('FROM')
-        params.extend(queues)
-        response = await self.execute_command(*params)
+        key = nohang, timeout, count, withcounters, queues
+        template = self._templates.get(key)
+        if template is None:
+            params = ['GETJOB']
+            if nohang is True:
+                params.append('NOHANG')
+            if timeout is not None:
+                params.extend(('TIMEOUT', timeout))
+            if count is not None:
+                params.extend(('COUNT', count))
+            if withcounters is not None:
+                params.append('WITHCOUNTERS')
+            params.append('FROM')
+            params.extend(queues)
+            template = self._cache_template(key, CommandTemplate(*params))
+        limiter = self.consumer_limiter
+        if limiter is not None:
+            await limiter.acquire(limiter.weight(count or 1))
+        execute = self.execute_template if nohang else self.execute_blocking
+        response = await execute(template)
         if response is not None:
-            jobs = render_jobs(response)
+            if limiter is not None and limiter.per == 'bytes':
+                limiter.debit(sum(len(res[2]) for res in response))
+            jobs = await self.decode_jobs(render_jobs(response), codec)
             if count is None:
                 return jobs.pop()
             return jobs
 
+    async def decode_jobs(self, jobs, codec=None):
+        """Decodes the bodies of jobs fetched with ``codec=False``
+
+        The bodies that refer to a blob become :class:`BlobReference`.
+
+        Parameters:
+            jobs (list): list of :class:`Job`
+            codec (Codec): decodes the jobs instead of the codec of the
+                           client
+        Returns:
+            list: the jobs, decoded in place
+        """
+        if codec is False:
+            return jobs
+        codec = self.codec if codec is None else codec
+        encoded = []
+        for job in jobs:
+            key = self._blob_key(job.body)
+            if key is not None:
+                job.body = BlobReference(self.blobs, key, codec)
+            else:
+                encoded.append(job)
+        if codec:
+            await codec.decode_jobs(encoded)
+        return jobs
+
+    def _blob_key(self, body):
+        if self.blobs is not None and is_reference(body):
+            key = reference_key(body)
+            if self.blobs.valid_key(key):
+                return key
+
     def getjob_iter(self, *queues, nohang=None, timeout=None, count=None,
                     withcounters=None, padding=None):
         """Returns an async iterator for getjob command.
@@ -218,12 +655,12 @@ class Disque:
             The total of really acknowledged jobs
         """
         assert jobs, 'At least one job required'
-        params = ['ACKJOB']
-        params.extend(getattr(job, 'id', job) for job in jobs)
-        response = await self.execute_command(*params)
+        ids = job_ids(jobs)
+        response = await self.execute_template(ACKJOB, *ids)
+        await self._delete_blobs(jobs)
         return response
 
-    async def fastack(self, *jobs):
+    async def fastack(self, *jobs, wait=True):
         """Performs a best effort cluster wide deletion
 
         When the network is well connected and there are no node failures,
@@ -234,16 +671,33 @@ class Disque:
 
         Parameters:
             *jobs: a list of :class:`Job` or job id
+            wait (bool): ``False`` returns once the command is buffered,
+                         without waiting for its reply. Errors are reported
+                         by :attr:`deferred`
 
         Returns:
-            The total of really acknowledged jobs
+            The total of really acknowledged jobs, or None when not waiting
+            for it
         """
         assert jobs, 'At least one job required'
-        params = ['FASTACK']
-        params.extend(getattr(job, 'id', job) for job in jobs)
-        response = await self.execute_command(*params)
+        ids = job_ids(jobs)
+        if not wait:
+            return await self.deferred.send(FASTACK, *ids,
+                                            then=self._blobs_deleter(jobs))
+        response = await self.execute_template(FASTACK, *ids)
+        await self._delete_blobs(jobs)
         return response
 
+    def _blobs_deleter(self, jobs):
+        if self.blobs is not None:
+            return lambda: self._delete_blobs(jobs)
+
+    async def _delete_blobs(self, jobs):
+        for job in jobs:
+            body = getattr(job, 'body', None)
+            if isinstance(body, BlobReference):
+                await body.delete()
+
     async def working(self, job):
         """Claims to be still working with the specified job
 
@@ -265,7 +719,7 @@ class Disque:
         response = await self.execute_command(*params)
         return response
 
-    async def nack(self, *jobs):
+    async def nack(self, *jobs, wait=True):
         """Tells Disque to put back the job in the queue asynchronous.
 
         It is very similar to :meth:`~Disque.enqueue` but it increments the
@@ -276,11 +730,14 @@ class Disque:
 
         Parameters:
             job (Job): a :class:`Job` or job id
+            wait (bool): ``False`` returns once the command is buffered,
+                         without waiting for its reply. Errors are reported
+                         by :attr:`deferred`
         """
         assert jobs, 'At least one job required'
-        params = ['NACK']
-        params.extend(getattr(job, 'id', job) for job in jobs)
-        response = await self.execute_command(*params)
+        if not wait:
+            return await self.deferred.send(NACK, *job_ids(jobs))
+        response = await self.execute_template(NACK, *job_ids(jobs))
         return response
 
     async def info(self):
@@ -380,7 +837,7 @@ class Disque:
         """
         response = await self.execute_command('QPEEK', queue, count)
         if response is not None:
-            return render_jobs(response)
+            return await self.decode_jobs(render_jobs(response))
 
     async def enqueue(self, *jobs):
         """Queue jobs if not already queued
@@ -568,14 +1025,87 @@ class Disque:
         Returns:
             object: the server response
         """
+        response, = await self.execute_messages([encode_command(*args)])
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    async def execute_template(self, template, *values):
+        """Sends a pre-encoded command to disque server
+
+        Parameters:
+            template (CommandTemplate): the command
+            *values: variable arguments of the command
+        Returns:
+            object: the server response
+        """
+        message = template.encode(*values)
+        response, = await self.execute_messages([message])
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    async def execute_blocking(self, template, *values):
+        """Sends a pre-encoded blocking command on its own connection
+
+        Disque serves the commands of a connection in order, the commands
+        sent meanwhile with :meth:`execute_template` are not delayed.
+
+        Parameters:
+            template (CommandTemplate): the command
+            *values: variable arguments of the command
+        Returns:
+            object: the server response
+        """
+        message = template.encode(*values)
+        try:
+            connection = await self._connect_blocking()
+            response, = await connection.send_messages([message])
+        except ClosedConnectionError:
+            connection = await self._connect_blocking(force=True)
+            response, = await connection.send_messages([message])
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    async def _connect_blocking(self, *, force=False):
+        connection = self._blocking_connection
+        if force or connection is None or connection.closed:
+            if connection is not None:
+                connection.close()
+            if self._closed:
+                raise RuntimeError('Connection already closed')
+            connection = await self._open_connection(set())
+            self._blocking_connection = connection
+        return connection
+
+    def _cache_template(self, key, template):
+        if len(self._templates) >= 256:
+            self._templates.clear()
+        self._templates[key] = template
+        return template
+
+    async def execute_messages(self, messages):
+        """Sends raw encoded commands at once to disque server
+
+        Parameters:
+            messages (list): commands encoded with :func:`encode_command`
+        Returns:
+            list: the server responses, where error replies are exceptions
+        """
+        if self.breaker is not None:
+            return await self.breaker.call(self._execute_messages, messages)
+        return await self._execute_messages(messages)
+
+    async def _execute_messages(self, messages):
         try:
             # naively assume that connection is still ok
             connection = await self.connect()
-            return await connection.send_command(*args)
+            return await connection.send_messages(messages)
         except ClosedConnectionError:
             # resend to a freshly opened connection
             connection = await self.connect(force=True)
-            return await connection.send_command(*args)
+            return await connection.send_messages(messages)
 
     async def connect(self, *, force=False):
         """Connect to the disque server
@@ -597,12 +1127,43 @@ class Disque:
             if self.auto_reconnect:
                 listeners.add(self.reset_connection)
 
-            connection = await connect(self.address,
-                                       loop=self.loop,
-                                       closed_listeners=listeners)
+            connection = await self._open_connection(listeners)
             self._connection = connection
         return self._connection
 
+    async def _open_connection(self, listeners):
+        address = parse_address(self.address, host='127.0.0.1', port=7711)
+        if self.prefer_unix and await is_local_address(
+                address, loop=self.loop):
+            if self.unix_socket is None:
+                self.unix_socket = await self._discover_unix_socket(address)
+            if self.unix_socket:
+                try:
+                    return await connect(self.unix_socket,
+                                         loop=self.loop,
+                                         closed_listeners=listeners,
+                                         high_water=self.high_water,
+                                         low_water=self.low_water)
+                except OSError:
+                    self.unix_socket = False
+        return await connect(address,
+                             loop=self.loop,
+                             closed_listeners=listeners,
+                             high_water=self.high_water,
+                             low_water=self.low_water)
+
+    async def _discover_unix_socket(self, address):
+        connection = await connect(address, loop=self.loop)
+        try:
+            response = await connection.send_command('CONFIG', 'GET',
+                                                     'unixsocket')
+        except ConnectionError:
+            return False
+        finally:
+            connection.close()
+        path = dict(grouper(2, response or [])).get('unixsocket')
+        return path if path and os.path.exists(path) else False
+
     def close(self):
         """Close the current connection
         """
@@ -610,6 +1171,9 @@ class Disque:
         if self._connection:
             self._connection.close()
             self._connection = None
+        if self._blocking_connection:
+            self._blocking_connection.close()
+            self._blocking_connection = None
 
     def reset_connection(self):
         """Reset the current connection
@@ -0,0 +1,728 @@
+import asyncio
+import json
+import os
+import random
+from collections import deque
+from .client import Disque
+from .connections import ConnectionError, ClosedConnectionError
+from .util import parse_address
+
+__all__ = ['Cluster', 'ClusterNode']
+
+
+class ClusterNode:
+    """
+    Attributes:
+        id (str): the node id
+        host (str): the node host, as advertised by HELLO
+        port (int): the node port, as advertised by HELLO
+        priority (int): lower is better, means node more available
+        client (Disque): the client bound to this node
+        rtt (float): moving average of the response time, in seconds
+        outstanding (int): number of commands waiting for a response
+        selections (int): number of commands routed to this node
+    """
+
+    #: weight of the last response time in the moving average
+    rtt_smoothing = 0.2
+
+    def __init__(self, id, host, port, priority, *, client, on_failure=None):
+        """
+        Parameters:
+            id (str): the node id
+            host (str): the node host
+            port (int): the node port
+            priority (int): the node priority
+            client (Disque): the client bound to this node
+            on_failure (callable): called when the node is unreachable
+        """
+        self.id = id
+        self.host = host
+        self.port = port
+        self.priority = priority
+        self.client = client
+        self.on_failure = on_failure
+        self.rtt = None
+        self.outstanding = 0
+        self.selections = 0
+
+    @property
+    def available(self):
+        """Tells if the node is not failing, and accepts commands
+        """
+        if self.priority >= Cluster.failing_priority:
+            return False
+        breaker = getattr(self.client, 'breaker', None)
+        return breaker is None or breaker.ready()
+
+    @property
+    def score(self):
+        """Load score of the node, lower is better
+
+        It combines the priority, the response time and the number of
+        outstanding commands.
+        """
+        rtt = self.rtt or 0.001
+        return self.priority * rtt * (self.outstanding + 1)
+
+    async def execute_command(self, *args):
+        """Sends a raw command to this node
+
+        Parameters:
+            *args: command arguments
+        Returns:
+            object: the server response
+        """
+        return await self._measure(self.client.execute_command(*args))
+
+    async def execute_messages(self, messages):
+        """Sends raw encoded commands at once to this node
+
+        Parameters:
+            messages (list): commands encoded with :func:`encode_command`
+        Returns:
+            list: the server responses, where error replies are exceptions
+        """
+        return await self._measure(self.client.execute_messages(messages))
+
+    async def execute_blocking(self, template, *values):
+        """Sends a pre-encoded blocking command to this node
+
+        Parameters:
+            template (CommandTemplate): the command
+            *values: variable arguments of the command
+        Returns:
+            object: the server response
+        """
+        return await self._measure(
+            self.client.execute_blocking(template, *values))
+
+    async def _measure(self, coro):
+        loop = self.client.loop or asyncio.get_event_loop()
+        started = loop.time()
+        self.outstanding += 1
+        try:
+            response = await coro
+        except (ClosedConnectionError, OSError):
+            if self.on_failure is not None:
+                self.on_failure()
+            raise
+        finally:
+            self.outstanding -= 1
+        self.observe(loop.time() - started)
+        return response
+
+    def observe(self, rtt):
+        """Updates the moving average of the response time
+
+        Parameters:
+            rtt (float): the last response time, in seconds
+        """
+        if self.rtt is None:
+            self.rtt = rtt
+        else:
+            self.rtt += self.rtt_smoothing * (rtt - self.rtt)
+
+    def __repr__(self):
+        return '<ClusterNode(id=%r, host=%r, port=%r, priority=%r)>' % (
+            self.id, self.host, self.port, self.priority)
+
+
+class Cluster(Disque):
+
+    """
+    A :class:`Disque` client that talks to every node of the cluster.
+
+    It bootstraps itself from one or more seed addresses, discovers the
+    other nodes with :meth:`~Disque.hello`, and routes commands to them::
+
+        client = Cluster(['10.0.0.1:7711', '10.0.0.2:7711'], locality=True)
+        job_id = await client.addjob('queue', 'body')
+
+    By default commands are sent to the node having the best priority.
+    With ``locality`` enabled, :meth:`~Disque.addjob` is routed to the
+    nodes where consumers of the queue are blocked, which saves the
+    federation hop between the producer node and the consumer node.
+    Consumers are learned from the ``blocked`` field of
+    :meth:`~Disque.qstat` and from the :meth:`~Disque.getjob` calls
+    done thru this client. It falls back to the best priority node when
+    no consumers are known.
+
+    With ``balance`` enabled, jobs of the other queues are spread among the
+    healthy nodes, using the power of two choices over a score that
+    combines the node priority, the average response time and the number
+    of outstanding commands. :meth:`stats` exposes the number of commands
+    routed to each node.
+
+    With ``topology_cache``, the last known nodes and their response times
+    are persisted into a local file. The next :meth:`discover` connects to
+    all the cached nodes in parallel and keeps the first one that answers,
+    instead of waiting for the seeds. Cached nodes that do not answer within
+    ``cache_timeout`` seconds are given up for the seeds.
+
+    The nodes and their priority are refreshed with :meth:`~Disque.hello`
+    in the background, every ``refresh_interval`` seconds, and as soon as a
+    node is unreachable, so that failing nodes are left aside and new nodes
+    are used.
+
+    :meth:`~Disque.addjob_many`, :meth:`~Disque.addjob_multi` and
+    :meth:`~Disque.publish` group their jobs by the node each queue is
+    routed to, and pipeline every group concurrently. The errors of a node
+    are reported in place of the responses of its jobs.
+
+    With ``hedge`` enabled, the read only commands (SHOW, QLEN, QSTAT and
+    QPEEK) are sent again to a second node when the first one did not
+    answer after the ``hedge_percentile`` of the observed read latencies.
+    The first answer wins, and the other command is cancelled. Keep in mind
+    that these answers are local to the node that gave them.
+
+    ``breaker`` is a factory of :class:`CircuitBreaker`, called once per
+    node. Nodes whose breaker is open are left aside by the routing, until
+    the breaker lets probes pass again::
+
+        client = Cluster(seeds, breaker=partial(CircuitBreaker, latency=.5))
+
+    Parameters:
+        addresses (list): seed tcp or unix addresses
+        loop (EventLoop): asyncio loop
+        auto_reconnect (bool): automatically reconnect after connection lost
+        locality (bool): route jobs to nodes where consumers are blocked
+        locality_ttl (float): number of seconds consumers locations are kept
+        balance (bool): spread jobs among the healthy nodes
+        topology_cache (str): path of the file where nodes are persisted
+        prefer_unix (bool): use the unix socket of co-located nodes
+        hedge (bool): send slow read only commands to a second node
+        hedge_percentile (float): percentile of the read latencies after
+                                  which a command is hedged
+        breaker (callable): returns a new circuit breaker for each node
+        high_water (int): high water mark of the write buffers, in bytes
+        low_water (int): low water mark of the write buffers, in bytes
+        refresh_interval (float): number of seconds between two refreshes
+                                  of the nodes, None to disable them
+
+    It accepts the other parameters of :class:`Disque` too, like ``codec``,
+    ``blobs``, ``dedup``, ``admission``, ``replication`` or
+    ``max_in_flight``, which apply to the whole cluster.
+    """
+
+    #: nodes having this priority or worse are considered as failing
+    failing_priority = 100
+
+    #: commands that can be hedged
+    read_commands = frozenset(['SHOW', 'QLEN', 'QSTAT', 'QPEEK'])
+
+    #: hedging delay used until enough read latencies are observed
+    hedge_delay = 0.05
+
+    #: minimum number of seconds between two refreshes of the nodes
+    refresh_backoff = 1
+
+    #: number of seconds the cached nodes are waited for by discover
+    cache_timeout = 0.5
+
+    def __init__(self, addresses, *, auto_reconnect=None, loop=None,
+                 locality=None, locality_ttl=5, balance=None,
+                 topology_cache=None, prefer_unix=None,
+                 hedge=None, hedge_percentile=95, breaker=None,
+                 high_water=None, low_water=None, refresh_interval=30,
+                 admission=None, producer_limiter=None, consumer_limiter=None,
+                 replication=None, codec=None, blobs=None, dedup=None,
+                 max_in_flight=1024, on_error=None):
+        if isinstance(addresses, (str, int)):
+            addresses = [addresses]
+        super().__init__(addresses, auto_reconnect=auto_reconnect, loop=loop,
+                         prefer_unix=prefer_unix, high_water=high_water,
+                         low_water=low_water, admission=admission,
+                         producer_limiter=producer_limiter,
+                         consumer_limiter=consumer_limiter,
+                         replication=replication, codec=codec, blobs=blobs,
+                         dedup=dedup, max_in_flight=max_in_flight,
+                         on_error=on_error)
+        self.breaker_factory = breaker
+        self.locality = locality
+        self.locality_ttl = locality_ttl
+        self.balance = balance
+        self.topology_cache = topology_cache
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.refresh_interval = refresh_interval
+        self._read_latencies = deque(maxlen=256)
+        self._refreshed_at = None
+        self._refresh = None
+        self.nodes = {}
+        self._consumers = {}
+        self._probes = {}
+
+    @property
+    def _loop(self):
+        return self.loop or asyncio.get_event_loop()
+
+    def node_client(self, address):
+        """Returns a new :class:`Disque` client for address
+        """
+        breaker = self.breaker_factory() if self.breaker_factory else None
+        return Disque(address, auto_reconnect=self.auto_reconnect,
+                      loop=self.loop, prefer_unix=self.prefer_unix,
+                      breaker=breaker, high_water=self.high_water,
+                      low_water=self.low_water)
+
+    async def discover(self):
+        """Discovers the cluster nodes
+
+        Cached nodes are tried first, for at most ``cache_timeout``
+        seconds, then seeds addresses are tried in order, until one of them
+        answers to :meth:`~Disque.hello`.
+
+        Returns:
+            dict: the cluster nodes, indexed by their id
+        """
+        if self._closed:
+            raise RuntimeError('Connection already closed')
+        if await self._discover_cached():
+            return self.nodes
+        error = None
+        for address in self.address:
+            client = self.node_client(address)
+            try:
+                response = await client.hello()
+            except (ConnectionError, OSError) as exc:
+                client.close()
+                error = exc
+                continue
+            self.update_nodes(response, client)
+            self.save_topology()
+            return self.nodes
+        raise ConnectionError('no seed node available') from error
+
+    async def _discover_cached(self):
+        cached = self.load_topology()
+        clients = {}
+        for info in cached:
+            client = self.node_client(parse_address((info['host'],
+                                                     info['port'])))
+            hello = asyncio.ensure_future(client.hello(), loop=self._loop)
+            clients[hello] = client
+        winner, pending = None, set(clients)
+        deadline = self._loop.time() + self.cache_timeout
+        while pending and not winner:
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(
+                pending, timeout=remaining,
+                return_when=asyncio.FIRST_COMPLETED)
+            for hello in done:
+                if not hello.exception() and not winner:
+                    winner = hello
+        for hello, client in clients.items():
+            hello.cancel()
+            if hello is not winner:
+                client.close()
+        if winner:
+            self.update_nodes(winner.result(), clients[winner])
+            rtts = {info['id']: info.get('rtt') for info in cached}
+            for node in self.nodes.values():
+                node.rtt = node.rtt or rtts.get(node.id)
+            self.save_topology()
+        return winner
+
+    def load_topology(self):
+        """Loads the nodes persisted into ``topology_cache``
+
+        Returns:
+            list: nodes informations, empty if they are not available
+        """
+        if not self.topology_cache:
+            return []
+        try:
+            with open(self.topology_cache) as file:
+                return json.load(file)['nodes']
+        except (OSError, ValueError, KeyError, TypeError):
+            return []
+
+    def save_topology(self):
+        """Persists the nodes into ``topology_cache``
+        """
+        if not self.topology_cache or not self.nodes:
+            return
+        data = {'nodes': [{'id': node.id,
+                           'host': node.host,
+                           'port': node.port,
+                           'priority': node.priority,
+                           'rtt': node.rtt}
+                          for node in self.nodes.values()]}
+        filename = '%s.tmp' % self.topology_cache
+        try:
+            with open(filename, 'w') as file:
+                json.dump(data, file)
+            os.replace(filename, self.topology_cache)
+        except OSError:
+            pass
+
+    def update_nodes(self, response, client=None):
+        """Updates nodes from a :meth:`~Disque.hello` response
+
+        Parameters:
+            response (dict): the hello response
+            client (Disque): the client that emitted the response
+        """
+        nodes = {}
+        for info in response['nodes']:
+            node = self.nodes.pop(info['id'], None)
+            if node is None:
+                if client and info['id'] == response['id']:
+                    node_client, client = client, None
+                else:
+                    address = parse_address((info['host'], int(info['port'])))
+                    node_client = self.node_client(address)
+                node = ClusterNode(info['id'], info['host'], int(info['port']),
+                                   int(info['priority']), client=node_client,
+                                   on_failure=self.refresh_soon)
+            node.priority = int(info['priority'])
+            nodes[node.id] = node
+        for node in self.nodes.values():
+            node.client.close()
+        if client:
+            client.close()
+        self.nodes = nodes
+        self._refreshed_at = self._loop.time()
+
+    async def refresh(self):
+        """Refreshes the nodes and their priority
+
+        Known nodes are asked with :meth:`~Disque.hello`, by order of
+        priority, until one of them answers. Nodes are discovered again
+        when none answers.
+
+        Returns:
+            dict: the cluster nodes, indexed by their id
+        """
+        self._refreshed_at = self._loop.time()
+        nodes = sorted(self.nodes.values(), key=lambda node: node.priority)
+        for node in nodes:
+            try:
+                response = await node.client.hello()
+            except (ConnectionError, OSError):
+                continue
+            self.update_nodes(response)
+            self.save_topology()
+            return self.nodes
+        return await self.discover()
+
+    def refresh_soon(self):
+        """Refreshes the nodes in the background
+
+        Refreshes are at least ``refresh_backoff`` seconds apart.
+        """
+        if self._closed or self._refresh is not None:
+            return
+        if self._refreshed_at is not None and \
+                self._loop.time() - self._refreshed_at < self.refresh_backoff:
+            return
+        self._refresh = asyncio.ensure_future(self._refresh_quietly(),
+                                              loop=self._loop)
+
+    async def _refresh_quietly(self):
+        try:
+            await self.refresh()
+        except (ConnectionError, OSError):
+            # the next command or interval will try again
+            pass
+        finally:
+            self._refresh = None
+
+    async def _ensure_nodes(self):
+        if not self.nodes:
+            await self.discover()
+        elif self.refresh_interval is not None and \
+                self._loop.time() - self._refreshed_at >= \
+                self.refresh_interval:
+            self.refresh_soon()
+
+    async def best_node(self, candidates=None):
+        """Returns the node having the best priority
+
+        Parameters:
+            candidates (list): restrict the choice to these node ids
+        Returns:
+            ClusterNode
+        """
+        await self._ensure_nodes()
+        nodes = self.healthy_nodes() or list(self.nodes.values())
+        if candidates:
+            nodes = [node for node in nodes if node.id in candidates] or nodes
+        return min(nodes, key=lambda node: node.priority)
+
+    def healthy_nodes(self):
+        """Returns the nodes that are not failing
+
+        Returns:
+            list: list of :class:`ClusterNode`
+        """
+        return [node for node in self.nodes.values() if node.available]
+
+    async def balanced_node(self):
+        """Returns a lightly loaded healthy node
+
+        Two healthy nodes are picked at random, and the one having the
+        lowest :attr:`ClusterNode.score` wins.
+
+        Returns:
+            ClusterNode
+        """
+        await self._ensure_nodes()
+        nodes = self.healthy_nodes()
+        if len(nodes) < 2:
+            return await self.best_node()
+        return min(random.sample(nodes, 2), key=lambda node: node.score)
+
+    def stats(self):
+        """Returns the routing statistics of every node
+
+        Returns:
+            dict: statistics indexed by node id
+        """
+        return {node.id: {'priority': node.priority,
+                          'available': node.available,
+                          'rtt': node.rtt,
+                          'outstanding': node.outstanding,
+                          'selections': node.selections}
+                for node in self.nodes.values()}
+
+    def hint_consumer(self, queue, node_id):
+        """Tells that a consumer of queue is blocked on node_id
+
+        Parameters:
+            queue (str): the queue name
+            node_id (str): the node id
+        """
+        expires, node_ids = self._consumers.get(queue, (None, set()))
+        if expires is None or expires < self._loop.time():
+            node_ids = set()
+        node_ids = node_ids | {node_id}
+        self._consumers[queue] = self._loop.time() + self.locality_ttl, node_ids
+
+    async def locate_consumers(self, queue):
+        """Returns the ids of the nodes where consumers of queue are blocked
+
+        Results are cached for ``locality_ttl`` seconds, and concurrent
+        calls for the same queue share the same round of :meth:`qstat`.
+
+        Parameters:
+            queue (str): the queue name
+        Returns:
+            set: node ids
+        """
+        expires, node_ids = self._consumers.get(queue, (None, None))
+        if expires is not None and expires >= self._loop.time():
+            return node_ids
+        if queue not in self._probes:
+            probe = asyncio.ensure_future(self._probe_consumers(queue),
+                                          loop=self._loop)
+            probe.add_done_callback(lambda fut: self._probes.pop(queue, None))
+            self._probes[queue] = probe
+        return await asyncio.shield(self._probes[queue])
+
+    async def _probe_consumers(self, queue):
+        await self._ensure_nodes()
+        nodes = list(self.nodes.values())
+        stats = await asyncio.gather(*[
+            node.client.qstat(queue) for node in nodes
+        ], return_exceptions=True)
+        node_ids = set()
+        for node, stat in zip(nodes, stats):
+            if isinstance(stat, dict) and int(stat.get('blocked') or 0):
+                node_ids.add(node.id)
+        self._consumers[queue] = self._loop.time() + self.locality_ttl, node_ids
+        return node_ids
+
+    async def route(self, *args):
+        """Returns the node that must execute the command
+
+        Parameters:
+            *args: command arguments
+        Returns:
+            ClusterNode
+        """
+        command = str(args[0]).upper()
+        if command != 'ADDJOB':
+            return await self.best_node()
+        if self.locality:
+            node_ids = await self.locate_consumers(args[1])
+            if node_ids:
+                return await self.best_node(node_ids)
+        if self.balance:
+            return await self.balanced_node()
+        return await self.best_node()
+
+    async def execute_command(self, *args):
+        """Sends a raw command to the routed node
+
+        Parameters:
+            *args: command arguments
+        Returns:
+            object: the server response
+        """
+        node = await self.route(*args)
+        node.selections += 1
+        if self.hedge and str(args[0]).upper() in self.read_commands:
+            return await self._execute_hedged(node, *args)
+        response = await node.execute_command(*args)
+        self._hint_consumers(node, args)
+        return response
+
+    async def execute_template(self, template, *values):
+        """Sends a pre-encoded command to the routed node
+
+        Parameters:
+            template (CommandTemplate): the command
+            *values: variable arguments of the command
+        Returns:
+            object: the server response
+        """
+        args = template.arguments(*values)
+        node = await self.route(*args)
+        node.selections += 1
+        response, = await node.execute_messages([template.encode(*values)])
+        if isinstance(response, Exception):
+            raise response
+        self._hint_consumers(node, args)
+        return response
+
+    async def execute_blocking(self, template, *values):
+        """Sends a pre-encoded blocking command to the routed node
+
+        Parameters:
+            template (CommandTemplate): the command
+            *values: variable arguments of the command
+        Returns:
+            object: the server response
+        """
+        args = template.arguments(*values)
+        node = await self.route(*args)
+        node.selections += 1
+        response = await node.execute_blocking(template, *values)
+        self._hint_consumers(node, args)
+        return response
+
+    def _hint_consumers(self, node, args):
+        if self.locality and str(args[0]).upper() == 'GETJOB':
+            for queue in args[list(args).index('FROM') + 1:]:
+                self.hint_consumer(queue, node.id)
+
+    async def execute_messages(self, messages):
+        """Sends raw encoded commands at once to the best node
+
+        Parameters:
+            messages (list): commands encoded with :func:`encode_command`
+        Returns:
+            list: the server responses, where error replies are exceptions
+        """
+        if self.balance:
+            node = await self.balanced_node()
+        else:
+            node = await self.best_node()
+        node.selections += 1
+        return await node.execute_messages(messages)
+
+    async def _execute_addjobs(self, queues, messages, window):
+        groups, routes = {}, {}
+        for index, queue in enumerate(queues):
+            if queue not in routes:
+                routes[queue] = await self.route('ADDJOB', queue)
+            node = routes[queue]
+            groups.setdefault(node, []).append(index)
+        responses = [None] * len(messages)
+        await asyncio.gather(*[
+            self._send_node_addjobs(node, indexes, messages, responses, window)
+            for node, indexes in groups.items()
+        ])
+        return responses
+
+    async def _send_node_addjobs(self, node, indexes, messages, responses,
+                                 window):
+        for i in range(0, len(indexes), window):
+            batch = indexes[i:i + window]
+            node.selections += 1
+            try:
+                results = await node.execute_messages([messages[index]
+                                                       for index in batch])
+            except (ConnectionError, OSError) as error:
+                results = [error] * len(batch)
+            for index, result in zip(batch, results):
+                responses[index] = result
+
+    def hedging_delay(self):
+        """Returns the number of seconds to wait before hedging a command
+        """
+        latencies = sorted(self._read_latencies)
+        if len(latencies) < 20:
+            return self.hedge_delay
+        index = int(len(latencies) * self.hedge_percentile / 100)
+        return latencies[min(index, len(latencies) - 1)]
+
+    async def _execute_hedged(self, node, *args):
+        started = self._loop.time()
+        primary = asyncio.ensure_future(node.execute_command(*args),
+                                        loop=self._loop)
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending,
+                                               timeout=self.hedging_delay())
+            if not done:
+                self._hedge(node, pending, *args)
+                done, pending = await self._first_answer(pending)
+        finally:
+            # nobody waits for the losers, or for a cancelled caller
+            for future in pending:
+                future.cancel()
+        self._read_latencies.append(self._loop.time() - started)
+        return done.pop().result()
+
+    def _hedge(self, node, pending, *args):
+        others = [other for other in self.healthy_nodes() if other is not node]
+        if others:
+            other = min(others, key=lambda other: other.score)
+            other.selections += 1
+            pending.add(asyncio.ensure_future(other.execute_command(*args),
+                                              loop=self._loop))
+
+    async def _first_answer(self, pending):
+        while True:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return {future}, pending
+            if not pending:
+                return done, pending
+
+    async def connect(self, *, force=False):
+        """Connect to the best node of the cluster
+
+        Parameters:
+            force (bool): exchange to a fresh connection
+        Returns:
+            Connection
+        """
+        node = await self.best_node()
+        return await node.client.connect(force=force)
+
+    def close(self):
+        """Close the connections to every node
+
+        The topology is persisted before, if ``topology_cache`` is set.
+        """
+        self.save_topology()
+        self._closed = True
+        if self._refresh is not None:
+            self._refresh.cancel()
+        for node in self.nodes.values():
+            node.client.close()
+        self.nodes = {}
+
+    def reset_connection(self):
+        """Reset the connections to every node
+        """
+        for node in self.nodes.values():
+            node.client.reset_connection()
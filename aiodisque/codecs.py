@@ -0,0 +1,225 @@
+import asyncio
+import json
+import lzma
+import pickle
+import zlib
+
+__all__ = ['Codec', 'register_serializer', 'register_compressor']
+
+#: serializers indexed by name, as ``(id, dumps, loads)``
+SERIALIZERS = {}
+
+#: compressors indexed by name, as ``(id, compress, decompress)``
+COMPRESSORS = {}
+
+_serializers = {}
+_compressors = {}
+
+
+def register_serializer(name, id, dumps, loads):
+    """Registers a serializer of job bodies
+
+    dumps must return bytes, and loads accepts a bytes-like object.
+    Ids 0 to 3 are used by the builtin serializers, and ids 4 to 7 are
+    left to the application. The id is written into the body, so it must
+    be the same on every producer and consumer.
+
+    Parameters:
+        name (str): name of the serializer
+        id (int): id of the serializer, between 0 and 7
+        dumps (callable): serializes an object
+        loads (callable): deserializes an object
+    """
+    assert 0 <= id <= 7, 'id must be between 0 and 7'
+    SERIALIZERS[name] = id, dumps, loads
+    _serializers[id] = loads
+
+
+def register_compressor(name, id, compress, decompress):
+    """Registers a compressor of job bodies
+
+    Ids 1 and 2 are used by zlib and lzma, and ids 3 to 6 are left to the
+    application. The header ``0xbf`` is reserved to blob references and chunks.
+
+    Parameters:
+        name (str): name of the compressor
+        id (int): id of the compressor, between 1 and 6
+        compress (callable): compresses bytes
+        decompress (callable): decompresses a bytes-like object
+    """
+    assert 1 <= id <= 6, 'id must be between 1 and 6'
+    COMPRESSORS[name] = id, compress, decompress
+    _compressors[id] = decompress
+
+
+def _dumps_text(obj):
+    return obj.encode('utf-8')
+
+
+def _loads_text(data):
+    return bytes(data).decode('utf-8')
+
+
+def _dumps_json(obj):
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+
+def _loads_json(data):
+    return json.loads(bytes(data).decode('utf-8'))
+
+
+register_serializer('text', 0, _dumps_text, _loads_text)
+register_serializer('bytes', 1, bytes, bytes)
+register_serializer('json', 2, _dumps_json, _loads_json)
+register_serializer('pickle', 3, pickle.dumps, pickle.loads)
+register_compressor('zlib', 1, zlib.compress, zlib.decompress)
+register_compressor('lzma', 2, lzma.compress, lzma.decompress)
+
+
+class Codec:
+    """Encodes and decodes job bodies
+
+    Bodies are serialized, then compressed when they are larger than
+    ``threshold`` bytes. A header byte ``0b10SSSCCC`` is prepended, where
+    ``SSS`` is the id of the serializer and ``CCC`` the id of the
+    compressor, or 0. Such a byte never starts a valid utf-8 string, so
+    plain text bodies, added without codec, are returned as is::
+
+        client = Disque(address, codec=Codec('json', compression='zlib'))
+        await client.addjob('q', {'foo': 'bar'})
+        job = await client.getjob('q')
+        assert job.body == {'foo': 'bar'}
+
+    A text body that is not compressed is sent without header, so that
+    clients without codec can read it.
+
+    A codec only decodes the bodies of its own serializer, and of the
+    serializers listed into ``accept``, whatever their compression. The
+    bodies of other serializers are returned as is, so that a producer
+    cannot make consumers unpickle its bodies unless they asked for it.
+
+    Decoding a large body may block the loop for a while. Encoded bodies
+    larger than ``offload_threshold`` bytes are decoded in ``executor``,
+    or in the default executor of the loop. The large bodies of a batch
+    are decoded together, by a single task of the executor. With a
+    process pool, custom serializers must be registered at import time.
+
+    Parameters:
+        serializer (str): one of ``text``, ``bytes``, ``json``, ``pickle``
+                          or a registered serializer
+        compression (str): one of ``zlib``, ``lzma`` or a registered
+                           compressor
+        threshold (int): size in bytes above which bodies are compressed
+        offload_threshold (int): size in bytes above which bodies are
+                                 decoded in the executor
+        executor (Executor): thread or process pool of the decoding
+        accept (list): names of the other serializers decoded
+    """
+
+    def __init__(self, serializer='text', *, compression=None,
+                 threshold=1024, offload_threshold=None, executor=None,
+                 accept=()):
+        self.serializer = serializer
+        self.compression = compression
+        self.threshold = threshold
+        self.offload_threshold = offload_threshold
+        self.executor = executor
+        self.accept = tuple(accept)
+        self._serializer_id, self._dumps, _ = SERIALIZERS[serializer]
+        self._accepted = frozenset([self._serializer_id] + [
+            SERIALIZERS[name][0] for name in self.accept])
+        if compression is not None:
+            self._compressor_id, self._compress, _ = COMPRESSORS[compression]
+
+    def encode(self, obj):
+        """Encodes obj into a job body
+
+        Returns:
+            str: text bodies sent as is
+            bytes: the header and the payload
+        """
+        data = self._dumps(obj)
+        compressor_id = 0
+        if self.compression is not None and len(data) > self.threshold:
+            compressed = self._compress(data)
+            if len(compressed) < len(data):
+                data, compressor_id = compressed, self._compressor_id
+        if not self._serializer_id and not compressor_id:
+            return obj
+        header = 0x80 | self._serializer_id << 3 | compressor_id
+        return bytes([header]) + data
+
+    def decode(self, body):
+        """Decodes a job body
+
+        Bodies of the serializers that are not accepted are returned as is.
+        """
+        return decode_body(body, self._accepted)
+
+    async def decode_many(self, bodies):
+        """Decodes a batch of job bodies
+
+        Large bodies are decoded in the executor.
+        """
+        bodies = list(bodies)
+        large = []
+        for i, body in enumerate(bodies):
+            if self._offloads(body):
+                large.append(i)
+            else:
+                bodies[i] = decode_body(body, self._accepted)
+        if large:
+            loop = asyncio.get_event_loop()
+            decoded = await loop.run_in_executor(self.executor, decode_bodies,
+                                                 [bodies[i] for i in large],
+                                                 self._accepted)
+            for i, body in zip(large, decoded):
+                bodies[i] = body
+        return bodies
+
+    async def decode_jobs(self, jobs):
+        """Decodes the bodies of jobs in place
+        """
+        bodies = await self.decode_many(job.body for job in jobs)
+        for job, body in zip(jobs, bodies):
+            job.body = body
+        return jobs
+
+    def _offloads(self, body):
+        return self.offload_threshold is not None and \
+            len(body) > self.offload_threshold and is_encoded(body)
+
+
+def is_encoded(body):
+    """Tells if body starts with a codec header
+    """
+    if isinstance(body, str):
+        return '\udc80' <= body[:1] < '\udcbf'
+    return 0x80 <= body[0] < 0xbf if body else False
+
+
+def decode_body(body, accepted):
+    """Decodes a job body encoded by :class:`Codec`
+
+    Bodies are read from the server as text, in which undecodable bytes
+    are escaped as surrogates. They are turned back into bytes here.
+    Bodies whose serializer id is not in accepted are returned as is.
+    """
+    if not is_encoded(body):
+        return body
+    data = body
+    if isinstance(body, str):
+        data = body.encode('utf-8', 'surrogateescape')
+    header = data[0]
+    if header >> 3 & 0x07 not in accepted:
+        return body
+    data = memoryview(data)[1:]
+    if header & 0x07:
+        data = _compressors[header & 0x07](data)
+    return _serializers[header >> 3 & 0x07](data)
+
+
+def decode_bodies(bodies, accepted):
+    """Decodes a batch of job bodies
+    """
+    return [decode_body(body, accepted) for body in bodies]
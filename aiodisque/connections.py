@@ -1,5 +1,6 @@
 import asyncio
 import hiredis
+from collections import deque
 from .util import parse_address, encode_command
 
 __all__ = ['connect', 'Connection', 'ConnectionError']
@@ -8,7 +9,8 @@ __all__ = ['connect', 'Connection', 'ConnectionError']
 def parser():
     return hiredis.Reader(protocolError=ProtocolError,
                           replyError=ConnectionError,
-                          encoding='utf-8')
+                          encoding='utf-8',
+                          errors='surrogateescape')
 
 
 class ConnectionError(RuntimeError):
@@ -23,8 +25,13 @@ class ProtocolError(ConnectionError):
     pass
 
 
-async def connect(address, *, loop=None, closed_listeners=None):
+async def connect(address, *, loop=None, closed_listeners=None,
+                  high_water=None, low_water=None):
     """Open a connection to Disque server.
+
+    ``high_water`` and ``low_water`` are the limits in bytes of the write
+    buffer. Once the buffer is above ``high_water``, commands wait until it
+    is drained below ``low_water``.
     """
     address = parse_address(address, host='127.0.0.1', port=7711)
 
@@ -37,48 +44,140 @@ async def connect(address, *, loop=None, closed_listeners=None):
     reader, writer = await future
     return Connection(reader, writer,
                       loop=loop,
-                      closed_listeners=closed_listeners)
+                      closed_listeners=closed_listeners,
+                      high_water=high_water,
+                      low_water=low_water)
 
 
 class Connection:
+    """
+    Attributes:
+        bytes_written (int): number of bytes handed to the transport
+    """
 
-    def __init__(self, reader, writer, *, loop=None, closed_listeners=None):
-        self._loop = loop
+    def __init__(self, reader, writer, *, loop=None, closed_listeners=None,
+                 high_water=None, low_water=None):
+        self._loop = loop or asyncio.get_event_loop()
         self._reader = reader
         self._writer = writer
         self.parser = parser()
         self._closed = False
         self._closing = None
         self._closed_listeners = closed_listeners or []
+        self._lock = asyncio.Lock()
+        self._pending = deque()
+        self._reading = None
+        self.bytes_written = 0
+        if high_water is not None or low_water is not None:
+            writer.transport.set_write_buffer_limits(high=high_water,
+                                                     low=low_water)
 
     async def send_command(self, *args):
         """Send command to server
         """
+        message = encode_command(*args)
+        response, = await self.send_messages([message])
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    async def send_messages(self, messages):
+        """Send many encoded commands at once, and read their responses
+
+        Commands are written in a single batch, and their responses are read
+        in the background, in the order commands were written. Commands of
+        concurrent callers are not mixed, and are written without waiting
+        for the responses of the previous ones. It waits for the write
+        buffer to drain below its low water mark when it exceeds its high
+        water mark.
+
+        Parameters:
+            messages (list): commands encoded with :func:`encode_command`
+        Returns:
+            list: the responses, where errors replies are exceptions
+        """
         if self.closed:
             raise ClosedConnectionError('closed connection')
 
-        message = encode_command(*args)
-
-        self._writer.write(message)
-        data = await self._reader.read(65536)
-        if self._reader.at_eof():
+        future = self._loop.create_future()
+        async with self._lock:
+            if self.closed:
+                raise ClosedConnectionError('closed connection')
+            self._pending.append((len(messages), future))
+            if self._reading is None:
+                self._reading = asyncio.ensure_future(self._read_forever(),
+                                                      loop=self._loop)
+            await self._write(b''.join(messages))
+        return await future
+
+    async def _read_forever(self):
+        try:
+            while self._pending:
+                count, future = self._pending[0]
+                responses = await self._read_responses(count)
+                self._pending.popleft()
+                # the caller may have been cancelled meanwhile
+                if not future.done():
+                    future.set_result(responses)
+                if self._reader and self._reader.at_eof():
+                    self._closing = True
+                    self._loop.call_soon(self._do_close, None)
+        except Exception as error:
+            self._fail_pending(error)
+        finally:
+            self._reading = None
+
+    def _fail_pending(self, error):
+        while self._pending:
+            count, future = self._pending.popleft()
+            if not future.done():
+                future.set_exception(error)
+                # the error is raised to the caller, if it still waits
+                future.exception()
+
+    async def _read_responses(self, count):
+        responses = []
+        while len(responses) < count:
+            try:
+                response = self.parser.gets()
+            except ProtocolError as error:
+                response = error
+            if isinstance(response, ProtocolError):
+                self._closing = True
+                self._loop.call_soon(self._do_close, response)
+                self.parser = parser()
+                raise response
+            if response is False:
+                self.parser.feed(await self._read())
+                continue
+            responses.append(response)
+        return responses
+
+    async def _write(self, data):
+        self._writer.write(data)
+        self.bytes_written += len(data)
+        try:
+            await self._writer.drain()
+        except ConnectionResetError as error:
             self._closing = True
             self._loop.call_soon(self._do_close, None)
-            raise ClosedConnectionError('Half closed connection')
-        self.parser.feed(data)
-        response = self.parser.gets()
-        if isinstance(response, ProtocolError):
-            self._closing = True
-            self._loop.call_soon(self._do_close, response)
-            self.parser = parser()
-            raise response
-        if isinstance(response, Exception):
-            raise response
+            raise ClosedConnectionError('Connection lost') from error
 
-        if self._reader.at_eof():
+    @property
+    def bytes_buffered(self):
+        """Number of bytes waiting into the write buffer
+        """
+        if self._writer:
+            return self._writer.transport.get_write_buffer_size()
+        return 0
+
+    async def _read(self):
+        data = await self._reader.read(65536)
+        if not data:
             self._closing = True
             self._loop.call_soon(self._do_close, None)
-        return response
+            raise ClosedConnectionError('Half closed connection')
+        return data
 
     def close(self):
         """Close connection."""
@@ -100,5 +199,8 @@ class Connection:
             self._writer.transport.close()
             self._writer = None
             self._reader = None
+            self._fail_pending(ClosedConnectionError('closed connection'))
+            if self._reading is not None:
+                self._reading.cancel()
             for listener in self._closed_listeners:
                 listener()
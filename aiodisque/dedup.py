@@ -0,0 +1,107 @@
+import asyncio
+import hashlib
+from collections import OrderedDict
+
+__all__ = ['DedupWindow']
+
+
+class DedupWindow:
+    """Skips the jobs added twice within a time window
+
+    A job is identified by its idempotency key, or by the hash of its queue
+    and encoded body. A job identified like one added less than ``ttl``
+    seconds ago is not added again, and the id of the first job is returned
+    instead. Jobs added concurrently share the same ADDJOB command. A
+    failed command is forgotten, so that the job can be retried.
+
+    Only the jobs added with an ``idempotency_key``, or with ``dedup=True``,
+    go thru the window of the client, so that the jobs added again on
+    purpose, like retries, are never skipped::
+
+        client = Disque(address, dedup=DedupWindow(ttl=10))
+        await client.addjob('q', body, idempotency_key='order-42')
+        await client.addjob('q', body, dedup=True)
+
+    At most ``maxsize`` jobs are remembered, the oldest being forgotten
+    first.
+
+    Parameters:
+        ttl (float): seconds a job is remembered
+        maxsize (int): maximum number of jobs remembered
+        loop (EventLoop): asyncio loop
+
+    Attributes:
+        hits (int): number of duplicates skipped
+        misses (int): number of jobs added
+        evicted (int): number of jobs forgotten before their ttl
+    """
+
+    def __init__(self, ttl=10, maxsize=2 ** 16, *, loop=None):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.loop = loop
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._entries = OrderedDict()
+
+    @property
+    def _loop(self):
+        return self.loop or asyncio.get_event_loop()
+
+    @property
+    def hit_rate(self):
+        """Rate of duplicates among the jobs submitted
+        """
+        total = self.hits + self.misses
+        return self.hits / total if total else 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(queue, body, idempotency_key=None):
+        """Returns the key that identifies a job
+        """
+        if idempotency_key is not None:
+            return queue, idempotency_key
+        if isinstance(body, str):
+            body = body.encode('utf-8', 'surrogateescape')
+        return queue, hashlib.sha1(body).digest()
+
+    def _expire(self):
+        now = self._loop.time()
+        while self._entries:
+            expires, _ = next(iter(self._entries.values()))
+            if expires > now:
+                break
+            self._entries.popitem(last=False)
+        while len(self._entries) >= self.maxsize:
+            self._entries.popitem(last=False)
+            self.evicted += 1
+
+    async def call(self, key, func, *args):
+        """Returns the result of func, called once per key and window
+        """
+        self._expire()
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            return await asyncio.shield(entry[1])
+        self.misses += 1
+        future = self._loop.create_future()
+        self._entries[key] = self._loop.time() + self.ttl, future
+        try:
+            response = await func(*args)
+        except Exception as error:
+            self._entries.pop(key, None)
+            future.set_exception(error)
+            # the error is raised to the caller, and to concurrent ones
+            future.exception()
+            raise
+        except BaseException:
+            self._entries.pop(key, None)
+            future.cancel()
+            raise
+        future.set_result(response)
+        return response
@@ -0,0 +1,167 @@
+import asyncio
+from collections import deque
+
+__all__ = ['DeferredCommands']
+
+
+class DeferredCommands:
+    """Sends commands without waiting for their replies
+
+    Commands sent with ``wait=False`` are buffered, and the commands sent
+    during the same loop iteration are pipelined at once. Their replies are
+    read in the background. Errors are counted, kept into ``failures``, and
+    given to ``on_error``, with the arguments of the failed command.
+
+    At most ``max_in_flight`` commands are buffered or waiting for their
+    replies. Beyond that, senders wait for replies to come.
+
+    Every client has one, that can be configured::
+
+        client = Disque(address, max_in_flight=512, on_error=report)
+        await client.fastack(job, wait=False)
+        await client.deferred.drain()
+
+    Parameters:
+        client (Disque): disque client
+        max_in_flight (int): maximum number of commands in flight
+        on_error (callable): called with the error and the command
+                             arguments of every failed command
+        loop (EventLoop): asyncio loop
+
+    Attributes:
+        in_flight (int): number of commands buffered or in flight
+        sent (int): number of commands replied
+        errors (int): number of commands failed
+        failures (deque): the last errors, as ``(error, arguments)`` pairs
+    """
+
+    def __init__(self, client, *, max_in_flight=1024, on_error=None,
+                 loop=None):
+        self.client = client
+        self.max_in_flight = max_in_flight
+        self.on_error = on_error
+        self.loop = loop
+        self.in_flight = 0
+        self.sent = 0
+        self.errors = 0
+        self.failures = deque(maxlen=100)
+        self._commands = []
+        self._handle = None
+        self._waiters = deque()
+        self._tasks = set()
+
+    @property
+    def _loop(self):
+        return self.loop or asyncio.get_event_loop()
+
+    async def send(self, template, *values, then=None, otherwise=None):
+        """Buffers a command, and returns once it is buffered
+
+        Parameters:
+            template (CommandTemplate): the command
+            *values: the variable arguments of the command
+            then (callable): returns a coroutine awaited on success
+            otherwise (callable): returns a coroutine awaited on failure
+        """
+        while self.in_flight >= self.max_in_flight:
+            waiter = self._loop.create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                # hand the slot it was woken for to the next sender
+                if waiter.done() and not waiter.cancelled():
+                    self._wake()
+                raise
+        self.in_flight += 1
+        self._commands.append((template, values, then, otherwise))
+        if self._handle is None:
+            self._handle = self._loop.call_soon(self._flush)
+
+    def _flush(self):
+        self._handle = None
+        commands, self._commands = self._commands, []
+        if commands:
+            task = asyncio.ensure_future(self._send(commands),
+                                         loop=self._loop)
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, commands):
+        try:
+            responses = await self._execute(commands)
+            for (template, values, then, otherwise), response in zip(
+                    commands, responses):
+                arguments = template.arguments(*values)
+                if isinstance(response, Exception):
+                    self._fail(response, arguments)
+                    then = otherwise
+                if then is not None:
+                    await self._callback(then, arguments)
+        finally:
+            self.sent += len(commands)
+            self.in_flight -= len(commands)
+            self._wake()
+
+    async def _execute(self, commands):
+        # ADDJOB commands are routed by queue, like the awaited ones
+        messages, responses = [], [None] * len(commands)
+        addjobs, queues, others = [], [], []
+        for index, (template, values, *_) in enumerate(commands):
+            messages.append(template.encode(*values))
+            arguments = template.arguments(*values)
+            if arguments[0] == 'ADDJOB':
+                addjobs.append(index)
+                queues.append(arguments[1])
+            else:
+                others.append(index)
+        groups = []
+        if addjobs:
+            groups.append(self._gather(responses, addjobs,
+                                       self.client._execute_addjobs,
+                                       queues, [messages[i] for i in addjobs],
+                                       len(addjobs)))
+        if others:
+            groups.append(self._gather(responses, others,
+                                       self.client.execute_messages,
+                                       [messages[i] for i in others]))
+        await asyncio.gather(*groups)
+        return responses
+
+    async def _gather(self, responses, indexes, func, *args):
+        try:
+            results = await func(*args)
+        except Exception as error:
+            results = [error] * len(indexes)
+        for index, result in zip(indexes, results):
+            responses[index] = result
+
+    async def _callback(self, callback, arguments):
+        try:
+            await callback()
+        except Exception as error:
+            # the command succeeded or failed, but its follow-up failed
+            self._fail(error, arguments)
+
+    def _fail(self, error, arguments):
+        self.errors += 1
+        self.failures.append((error, arguments))
+        if self.on_error is not None:
+            self.on_error(error, arguments)
+
+    def _wake(self):
+        free = self.max_in_flight - self.in_flight
+        while self._waiters and free > 0:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    async def drain(self):
+        """Sends the buffered commands, and waits for every reply
+        """
+        if self._handle is not None:
+            self._handle.cancel()
+            self._flush()
+        while self._tasks:
+            await asyncio.wait(list(self._tasks))
@@ -0,0 +1,205 @@
+import struct
+from .util import Batcher
+
+__all__ = ['Envelope', 'EnvelopeProducer', 'EnvelopeConsumer']
+
+#: header of the bodies that pack many messages
+MARKER = b'\xbfE'
+
+_size = struct.Struct('>I')
+
+
+def pack_envelope(messages):
+    """Packs encoded messages into one body
+    """
+    parts = [MARKER]
+    for message in messages:
+        parts.append(_size.pack(len(message)))
+        parts.append(message)
+    return b''.join(parts)
+
+
+def unpack_envelope(body):
+    """Returns the messages of a body, as memoryview slices
+
+    A body that is not an envelope is a single message.
+    """
+    if isinstance(body, str):
+        body = body.encode('utf-8', 'surrogateescape')
+    view = memoryview(body)
+    if view[:2] != MARKER:
+        return [view]
+    messages, offset = [], 2
+    while offset < len(view):
+        size, = _size.unpack_from(view, offset)
+        offset += _size.size
+        messages.append(view[offset:offset + size])
+        offset += size
+    return messages
+
+
+def encode_message(message, codec=None):
+    if codec:
+        message = codec.encode(message)
+    if isinstance(message, str):
+        message = message.encode('utf-8', 'surrogateescape')
+    return message
+
+
+def decode_text(message):
+    if isinstance(message, memoryview):
+        return bytes(message).decode('utf-8', 'surrogateescape')
+    return message
+
+
+class Envelope:
+    """Messages of a job fetched by :class:`EnvelopeConsumer`
+
+    Attributes:
+        job (Job): the job that carries the envelope
+        messages (list): the decoded messages
+        raw (list): the encoded messages, as memoryview slices of the body
+    """
+
+    def __init__(self, job, messages, raw):
+        self.job = job
+        self.messages = messages
+        self.raw = raw
+
+    def __iter__(self):
+        return iter(self.messages)
+
+    def __len__(self):
+        return len(self.messages)
+
+    def __repr__(self):
+        return '<Envelope(id=%r, messages=%d)>' % (self.job.id, len(self))
+
+
+class EnvelopeProducer(Batcher):
+    """Packs many small messages of a queue into one job
+
+    Messages are buffered, and added as one job once ``max_count``
+    messages or ``max_bytes`` bytes are buffered, or ``max_delay`` seconds
+    after the first one. It saves the cost of the job id, replication and
+    acknowledge of every message::
+
+        producer = EnvelopeProducer(client, 'telemetry', max_delay=0.01)
+        await producer.add('message')
+        await producer.close()
+
+    Messages are encoded with ``codec``, or with the codec of the client.
+    Options of :meth:`Disque.addjob` are shared by every envelope.
+
+    Parameters:
+        client (Disque): disque client
+        queue (str): name of the queue
+        max_count (int): maximum number of messages of an envelope
+        max_bytes (int): maximum size of an envelope, in bytes
+        max_delay (float): maximum seconds a message is buffered
+        codec (Codec): encodes the messages
+        loop (EventLoop): asyncio loop
+        **options: options of :meth:`Disque.addjob`
+
+    Attributes:
+        envelopes (int): number of envelopes added
+        messages (int): number of messages added
+    """
+
+    def __init__(self, client, queue, *, max_count=100, max_bytes=2 ** 16,
+                 max_delay=0.01, codec=None, loop=None, **options):
+        super().__init__(max_delay=max_delay, loop=loop)
+        self.client = client
+        self.queue = queue
+        self.max_count = max_count
+        self.max_bytes = max_bytes
+        self.codec = codec
+        self.options = options
+        self.envelopes = 0
+        self.messages = 0
+
+    def add_nowait(self, message):
+        """Buffers a message
+
+        Returns:
+            Future: the id of the envelope, once it is added
+        """
+        codec = self.client.codec if self.codec is None else self.codec
+        data = encode_message(message, codec)
+        return self.push(data, _size.size + len(data))
+
+    async def add(self, message):
+        """Buffers a message, and waits until its envelope is added
+
+        Returns:
+            str: the id of the envelope
+        """
+        return await self.add_nowait(message)
+
+    def full(self, count, size):
+        return count >= self.max_count or \
+            len(MARKER) + size >= self.max_bytes
+
+    async def process(self, messages):
+        response = await self.client.addjob(self.queue,
+                                            pack_envelope(messages),
+                                            codec=False, **self.options)
+        self.envelopes += 1
+        self.messages += len(messages)
+        return response
+
+
+class EnvelopeConsumer:
+    """Fetches the envelopes of a queue
+
+    Messages are sliced from the body without copy. They are decoded with
+    ``codec``, or with the codec of the client, otherwise they are left as
+    memoryview slices of the body. Jobs that are not envelopes have a
+    single message.
+
+    When some messages fail, :meth:`complete` adds them back into a new
+    envelope, and acknowledges the original one::
+
+        envelope = await consumer.get()
+        failed = [i for i, msg in enumerate(envelope) if not handle(msg)]
+        await consumer.complete(envelope, failed)
+
+    Parameters:
+        client (Disque): disque client
+        queue (str): name of the queue
+        codec (Codec): decodes the messages
+    """
+
+    def __init__(self, client, queue, *, codec=None):
+        self.client = client
+        self.queue = queue
+        self.codec = codec
+
+    async def get(self):
+        """Returns the next envelope of the queue
+
+        Returns:
+            Envelope
+        """
+        job = await self.client.getjob(self.queue, codec=False)
+        raw = unpack_envelope(job.body)
+        codec = self.client.codec if self.codec is None else self.codec
+        if not codec:
+            return Envelope(job, list(raw), raw)
+        messages = await codec.decode_many(raw)
+        messages = [decode_text(msg) for msg in messages]
+        return Envelope(job, messages, raw)
+
+    async def complete(self, envelope, failed=(), **options):
+        """Acknowledges an envelope, and adds its failed messages back
+
+        Parameters:
+            envelope (Envelope): the envelope
+            failed (list): indexes of the messages that failed
+            **options: options of :meth:`Disque.addjob`
+        """
+        if failed:
+            messages = [envelope.raw[i] for i in failed]
+            await self.client.addjob(self.queue, pack_envelope(messages),
+                                     codec=False, **options)
+        await self.client.ackjob(envelope.job)
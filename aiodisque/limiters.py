@@ -0,0 +1,97 @@
+import asyncio
+from collections import deque
+
+__all__ = ['TokenBucket']
+
+
+class TokenBucket:
+    """Async token bucket rate limiter
+
+    The bucket holds up to ``burst`` tokens, and is refilled with ``rate``
+    tokens per second. Tokens are counted either by jobs or by bytes,
+    depending on ``per``.
+
+    Waiters are served in order, and a single timer wakes them when enough
+    tokens are available, instead of polling. A weight larger than the
+    burst is served once the bucket is full, and leaves it in debt.
+
+    It can be attached to a client, to cap the rate of jobs added or
+    fetched, or to a :class:`JobsQueue`::
+
+        client = Disque(address,
+                        producer_limiter=TokenBucket(1000, burst=100),
+                        consumer_limiter=TokenBucket(2 ** 20, per='bytes'))
+
+    Parameters:
+        rate (float): number of tokens added per second
+        burst (float): maximum number of tokens, defaults to rate
+        per (str): unit of tokens, one of ``jobs`` or ``bytes``
+        loop (EventLoop): asyncio loop
+    """
+
+    def __init__(self, rate, burst=None, *, per='jobs', loop=None):
+        assert per in ('jobs', 'bytes'), 'per must be jobs or bytes'
+        self.rate = rate
+        self.burst = burst or rate
+        self.per = per
+        self.loop = loop or asyncio.get_event_loop()
+        self.tokens = self.burst
+        self._updated = self.loop.time()
+        self._waiters = deque()
+        self._handle = None
+
+    def weight(self, count, size=0):
+        """Returns the weight of count jobs, totalizing size bytes
+        """
+        return size if self.per == 'bytes' else count
+
+    def _refill(self):
+        now = self.loop.time()
+        elapsed = now - self._updated
+        self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+        self._updated = now
+
+    async def acquire(self, weight=1):
+        """Waits until weight tokens are available, and takes them
+
+        A weight of 0 waits until the bucket is not in debt.
+        """
+        if not self._waiters:
+            self._refill()
+            if self.tokens >= min(weight, self.burst):
+                self.tokens -= weight
+                return
+        waiter = self.loop.create_future()
+        self._waiters.append((weight, waiter))
+        self._schedule()
+        await waiter
+
+    def debit(self, weight):
+        """Takes weight tokens without waiting
+
+        It allows to pay after the fact, when the weight is known once
+        the command has been executed.
+        """
+        self._refill()
+        self.tokens -= weight
+
+    def _schedule(self):
+        if self._handle is None and self._waiters:
+            self._refill()
+            weight, waiter = self._waiters[0]
+            missing = min(weight, self.burst) - self.tokens
+            self._handle = self.loop.call_later(max(0, missing / self.rate),
+                                                self._wake)
+
+    def _wake(self):
+        self._handle = None
+        self._refill()
+        while self._waiters:
+            weight, waiter = self._waiters[0]
+            if not waiter.done():
+                if self.tokens < min(weight, self.burst):
+                    break
+                self.tokens -= weight
+                waiter.set_result(None)
+            self._waiters.popleft()
+        self._schedule()
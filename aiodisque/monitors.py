@@ -0,0 +1,149 @@
+import asyncio
+import random
+
+__all__ = ['MemoryMonitor']
+
+
+class MemoryMonitor:
+    """Throttles producers while the server memory gets close to a budget
+
+    It samples :meth:`~Disque.info` every ``interval`` seconds. Below
+    ``threshold`` of the ``budget``, every job is admitted. Between the
+    threshold and the budget, the rate of admitted jobs decreases linearly
+    down to zero, and refused producers wait for the next sample to try
+    again. A batch is admitted at the rate of the memory it would reach
+    once added, so that large batches are throttled more than single jobs.
+
+    After ``max_failures`` consecutive samples failed, the monitor fails
+    open and admits every job, or with ``fail_open=False`` fails closed:
+    throttled producers get the error of the last sample.
+
+    Give it to a client, so that :meth:`~Disque.addjob`,
+    :meth:`~Disque.addjob_many` and :meth:`JobsQueue.put` are throttled::
+
+        client = Disque(address)
+        client.admission = MemoryMonitor(client, budget=2 ** 30)
+
+    Parameters:
+        client (Disque): disque client
+        budget (int): memory budget of the node, in bytes
+        threshold (float): part of the budget where throttling starts
+        interval (float): number of seconds between two samples
+        max_failures (int): number of failed samples before failing open
+                            or closed
+        fail_open (bool): admit every job while the node is not sampled
+        loop (EventLoop): asyncio loop
+
+    Attributes:
+        used_memory (int): last sampled memory used by the node
+        registered_jobs (int): last sampled number of jobs of the node
+        admission (float): rate of jobs admitted, between 0 and 1
+        throttled (int): number of times producers had to wait
+        failures (int): number of consecutive samples that failed
+        last_error (Exception): error of the last failed sample
+    """
+
+    def __init__(self, client, budget, *, threshold=0.8, interval=1,
+                 max_failures=3, fail_open=True, loop=None):
+        self.client = client
+        self.budget = budget
+        self.threshold = threshold
+        self.interval = interval
+        self.max_failures = max_failures
+        self.fail_open = fail_open
+        self.loop = loop or asyncio.get_event_loop()
+        self.used_memory = None
+        self.registered_jobs = None
+        self.admission = 1
+        self.throttled = 0
+        self.failures = 0
+        self.last_error = None
+        self._sampled = self.loop.create_future()
+        self._task = None
+
+    def start(self):
+        """Starts sampling in the background
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run(), loop=self.loop)
+
+    def stop(self):
+        """Stops sampling, and admits the waiting producers
+        """
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        # no sample will come to wake them up
+        self.admission = 1
+        sampled, self._sampled = self._sampled, self.loop.create_future()
+        sampled.set_result(self.admission)
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sample()
+            except Exception as error:
+                self._fail(error)
+            await asyncio.sleep(self.interval)
+
+    def _fail(self, error):
+        self.failures += 1
+        self.last_error = error
+        if self.failures < self.max_failures:
+            # keep the last admission rate while the node is unreachable
+            return
+        sampled, self._sampled = self._sampled, self.loop.create_future()
+        if self.fail_open:
+            self.admission = 1
+            sampled.set_result(self.admission)
+        else:
+            sampled.set_exception(error)
+            # raised to the waiting producers, if any
+            sampled.exception()
+
+    @property
+    def failing(self):
+        """Tells if the node failed to be sampled too many times
+        """
+        return self.failures >= self.max_failures
+
+    async def sample(self):
+        """Samples the memory of the node, and updates the admission rate
+        """
+        info = await self.client.info()
+        self.used_memory = int(info.get('used_memory') or 0)
+        self.registered_jobs = int(info.get('registered_jobs') or 0)
+        self.admission = self.rate(self.used_memory)
+        self.failures = 0
+        sampled, self._sampled = self._sampled, self.loop.create_future()
+        sampled.set_result(self.admission)
+
+    def rate(self, memory):
+        """Returns the admission rate of the node using memory bytes
+        """
+        soft_limit = self.budget * self.threshold
+        if memory <= soft_limit:
+            return 1
+        return max(0, (self.budget - memory) / (self.budget - soft_limit))
+
+    def batch_rate(self, size=0):
+        """Returns the admission rate of a batch of size bytes
+        """
+        if self.admission >= 1:
+            return 1
+        return min(self.admission, self.rate(self.used_memory + size))
+
+    async def admit(self, size=0):
+        """Waits until a batch of jobs of size bytes can be added
+
+        A batch is admitted as a whole. Sampling starts with the first call.
+
+        Raises:
+            Exception: the error of the last sample, when failing closed
+        """
+        self.start()
+        while random.random() >= self.batch_rate(size):
+            if self.failing and not self.fail_open:
+                raise self.last_error
+            self.throttled += 1
+            await asyncio.shield(self._sampled)
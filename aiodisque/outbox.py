@@ -0,0 +1,221 @@
+import asyncio
+import json
+import sqlite3
+from .breakers import CircuitOpenError
+from .connections import ConnectionError, ClosedConnectionError
+from .connections import ProtocolError
+
+__all__ = ['Outbox']
+
+
+class Outbox:
+    """Spools jobs on disk while the cluster is unavailable
+
+    :meth:`addjob` adds the job with the client. When no node is reachable,
+    or when it does not answer within ``timeout`` seconds, the job is
+    appended to a SQLite spool instead. A background drainer replays the
+    spooled jobs with pipelined ADDJOB once the cluster recovers.
+
+    While jobs are spooled, new jobs are spooled after them, in order to
+    keep their order. Spooled jobs are committed by batches every
+    ``commit_interval`` seconds, so that many jobs share the same fsync.
+    Jobs are delivered at least once: a job whose command timed out may
+    have been added anyway. Only the options of ADDJOB itself are accepted,
+    as they are spooled with the job.
+
+    Parameters:
+        client (Disque): disque client
+        path (str): path of the SQLite spool
+        timeout (float): latency budget of addjob, in seconds
+        retry_interval (float): seconds between two attempts to drain
+        batch_size (int): maximum number of jobs replayed at once
+        commit_interval (float): seconds between two commits of the spool
+        max_attempts (int): refused jobs are dropped after these attempts
+        loop (EventLoop): asyncio loop
+
+    Attributes:
+        spooled (int): number of jobs spooled
+        replayed (int): number of spooled jobs added
+        dropped (int): number of spooled jobs refused too many times
+        errors (int): number of attempts to drain that failed otherwise
+                      than on outage
+        last_error (Exception): the last of these errors
+    """
+
+    #: exceptions that mean that the cluster is unavailable
+    outages = (ClosedConnectionError, ProtocolError, CircuitOpenError,
+               OSError, asyncio.TimeoutError)
+
+    #: options of :meth:`~Disque.addjob` that can be spooled
+    options = frozenset(['replicate', 'delay', 'retry', 'ttl', 'maxlen',
+                         'asynchronous'])
+
+    def __init__(self, client, path, *, timeout=None, retry_interval=1,
+                 batch_size=500, commit_interval=0.05, max_attempts=10,
+                 loop=None):
+        self.client = client
+        self.path = path
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self.batch_size = batch_size
+        self.commit_interval = commit_interval
+        self.max_attempts = max_attempts
+        self.loop = loop or asyncio.get_event_loop()
+        self.spooled = 0
+        self.replayed = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_error = None
+        self._db = sqlite3.connect(path)
+        self._db.execute('CREATE TABLE IF NOT EXISTS jobs ('
+                         'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                         'queue TEXT, body BLOB, options TEXT, '
+                         'attempts INTEGER DEFAULT 0)')
+        self._db.commit()
+        self._commit_handle = None
+        self._drainer = None
+        self._pending = self._db.execute('SELECT COUNT(*) '
+                                         'FROM jobs').fetchone()[0]
+        if self._pending:
+            self.start()
+
+    def pending(self):
+        """Returns the number of spooled jobs
+        """
+        return self._pending
+
+    async def addjob(self, queue, job, ms_timeout=0, *, codec=None,
+                     **options):
+        """Adds a job, or spools it when the cluster is unavailable
+
+        It accepts the same parameters than :meth:`~Disque.addjob`, except
+        ``idempotency_key`` and ``wait``. The job is encoded with the codec
+        before being spooled, and replayed as is.
+
+        Returns:
+            The id of the added job, or None if it has been spooled
+        Raises:
+            TypeError: an option cannot be spooled
+        """
+        self._check_options(options)
+        body = self.client._encode_body(job, codec)
+        if not self._pending:
+            try:
+                coro = self.client.addjob(queue, body, ms_timeout,
+                                          codec=False, **options)
+                return await asyncio.wait_for(coro, self.timeout)
+            except Exception as error:
+                if not self._outage(error):
+                    raise
+        self.spool(queue, body, ms_timeout, **options)
+
+    def spool(self, queue, body, ms_timeout=0, **options):
+        """Appends a job to the spool, and starts the drainer
+
+        body must be already encoded, as it is replayed as is.
+        """
+        self._check_options(options)
+        options['ms_timeout'] = ms_timeout
+        self._db.execute('INSERT INTO jobs (queue, body, options) '
+                         'VALUES (?, ?, ?)',
+                         (queue, body, json.dumps(options, sort_keys=True)))
+        self.spooled += 1
+        self._pending += 1
+        if not self.commit_interval:
+            self._commit()
+        elif self._commit_handle is None:
+            self._commit_handle = self.loop.call_later(self.commit_interval,
+                                                       self._commit)
+        self.start()
+
+    def _check_options(self, options):
+        unknown = set(options) - self.options
+        if unknown:
+            raise TypeError('options cannot be spooled: %s'
+                            % ', '.join(sorted(unknown)))
+
+    def _outage(self, error):
+        if isinstance(error, self.outages):
+            return True
+        return (isinstance(error, ConnectionError) and
+                str(error).startswith('NOREPL'))
+
+    def _commit(self):
+        self._commit_handle = None
+        self._db.commit()
+
+    def start(self):
+        """Starts the drainer in the background
+        """
+        if self._drainer is None or self._drainer.done():
+            self._drainer = asyncio.ensure_future(self._drain_forever(),
+                                                  loop=self.loop)
+
+    async def _drain_forever(self):
+        while self._pending:
+            await asyncio.sleep(self.retry_interval)
+            try:
+                await self.drain()
+            except self.outages:
+                continue
+            except Exception as error:
+                # keep draining, the next attempt may succeed
+                self.errors += 1
+                self.last_error = error
+
+    async def drain(self):
+        """Replays the spooled jobs once, by batches
+
+        Jobs refused by the cluster are kept for the next attempt. The
+        replay stops on an outage, without counting it as an attempt.
+        """
+        last = 0
+        while True:
+            rows = self._db.execute('SELECT id, queue, body, options '
+                                    'FROM jobs WHERE id > ? ORDER BY id '
+                                    'LIMIT ?',
+                                    (last, self.batch_size)).fetchall()
+            if not rows:
+                return
+            last = rows[-1][0]
+            groups = {}
+            for row in rows:
+                groups.setdefault(row[3], []).append(row)
+            for options, group in groups.items():
+                if not await self._replay(json.loads(options), group):
+                    return
+
+    async def _replay(self, options, rows):
+        ms_timeout = options.pop('ms_timeout', 0)
+        options = {k: v for k, v in options.items() if k in self.options}
+        jobs = [(queue, body) for id, queue, body, opts in rows]
+        responses = await self.client.addjob_multi(jobs, ms_timeout,
+                                                   codec=False, **options)
+        added, refused, available = [], [], True
+        for row, response in zip(rows, responses):
+            if not isinstance(response, Exception):
+                added.append((row[0],))
+            elif self._outage(response):
+                available = False
+            else:
+                refused.append((row[0],))
+        self._db.executemany('DELETE FROM jobs WHERE id = ?', added)
+        self._db.executemany('UPDATE jobs SET attempts = attempts + 1 '
+                             'WHERE id = ?', refused)
+        cursor = self._db.execute('DELETE FROM jobs WHERE attempts >= ?',
+                                  (self.max_attempts,))
+        self._db.commit()
+        self.replayed += len(added)
+        self.dropped += cursor.rowcount
+        self._pending -= len(added) + cursor.rowcount
+        return available
+
+    def close(self):
+        """Commits the spool, and stops the drainer
+        """
+        if self._commit_handle is not None:
+            self._commit_handle.cancel()
+        self._commit()
+        if self._drainer is not None:
+            self._drainer.cancel()
+        self._db.close()
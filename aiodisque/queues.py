@@ -1,6 +1,97 @@
 import asyncio
+import zlib
+from collections import deque
+from .connections import ConnectionError
 
-__all__ = ['JobsQueue']
+__all__ = ['JobsQueue', 'LengthWatcher', 'ShardedQueue']
+
+
+class LengthWatcher:
+    """Waits for a queue to have free slots
+
+    A single poller checks the length of the queue for all the waiters.
+    Polling is adaptive: its interval doubles up to ``max_interval`` while
+    the queue stays full, and falls back to ``min_interval`` once slots are
+    freed. Waiters are woken in order, no more than the number of free
+    slots at once.
+
+    Use :meth:`get` to share the same watcher between every producer::
+
+        watcher = LengthWatcher.get(client, 'queue')
+        await watcher.wait(maxlen=100)
+
+    Parameters:
+        client (Disque): disque client
+        queue (str): the queue name
+        min_interval (float): shortest interval between polls, in seconds
+        max_interval (float): longest interval between polls, in seconds
+        loop (EventLoop): asyncio loop
+    """
+
+    def __init__(self, client, queue, *, min_interval=0.01, max_interval=1,
+                 loop=None):
+        self.client = client
+        self.queue = queue
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.loop = loop or asyncio.get_event_loop()
+        self.polls = 0
+        self._waiters = deque()
+        self._poller = None
+
+    @classmethod
+    def get(cls, client, queue, **kwargs):
+        """Returns the watcher of queue shared by users of client
+
+        Watchers are kept by the client, and go away with it.
+        """
+        watchers = client._watchers
+        if queue not in watchers:
+            watchers[queue] = cls(client, queue, **kwargs)
+        return watchers[queue]
+
+    async def wait(self, maxlen):
+        """Waits until the queue holds less than maxlen jobs
+        """
+        waiter = self.loop.create_future()
+        self._waiters.append((maxlen, waiter))
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.ensure_future(self._poll(), loop=self.loop)
+        await waiter
+
+    async def _poll(self):
+        interval = self.min_interval
+        while self._waiters:
+            try:
+                length = await self.client.qlen(self.queue)
+            except Exception as error:
+                self._fail(error)
+                return
+            self.polls += 1
+            if self._wake(length):
+                interval = self.min_interval
+            else:
+                interval = min(interval * 2, self.max_interval)
+            if self._waiters:
+                await asyncio.sleep(interval)
+
+    def _wake(self, length):
+        woken = 0
+        while self._waiters:
+            maxlen, waiter = self._waiters[0]
+            if not waiter.done():
+                if length + woken >= maxlen:
+                    break
+                waiter.set_result(None)
+                woken += 1
+            self._waiters.popleft()
+        return woken
+
+    def _fail(self, error):
+        while self._waiters:
+            maxlen, waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_exception(error)
 
 
 class JobsQueue:
@@ -17,18 +108,35 @@ class JobsQueue:
         :class:`JobsQueue` object which is full.
         """
 
-    def __init__(self, queue, client, *, maxsize=0, loop=None):
+    def __init__(self, queue, client, *, maxsize=0, loop=None, profile=None,
+                 producer_limiter=None, consumer_limiter=None, codec=None):
         """Constructor for a FIFO queue
 
         maxsize is an integer that sets the upperbound limit on the number of
         items that can be placed in the queue. Insertion will block once this
         size has been reached, until queue items are consumed. If maxsize is
         less than or equal to zero, the queue size is infinite
+
+        profile is a :class:`JobProfile` of this queue, that is registered
+        into client. Items put without any option are added with its
+        pre-encoded options, which should include maxsize as ``maxlen``.
+
+        producer_limiter and consumer_limiter are :class:`TokenBucket` that
+        cap the rate of items put and got from this queue.
+
+        codec is a :class:`Codec` that encodes and decodes the items of this
+        queue, instead of the codec of the client.
         """
         self.name = queue
         self.client = client
         self.maxsize = maxsize
         self.loop = loop or asyncio.get_event_loop()
+        self.profile = profile
+        self.producer_limiter = producer_limiter
+        self.consumer_limiter = consumer_limiter
+        self.codec = codec
+        if profile is not None:
+            client.profiles[queue] = profile
 
     def empty(self):
         """Return True if the queue is empty, False otherwise
@@ -46,10 +154,20 @@ class JobsQueue:
         If queue is empty, wait until an item is available.
         See also The empty() method.
         """
-        job = await self.client.getjob(self.name, nohang=False,
-                                       withcounters=None)
+        limiter = self.consumer_limiter
+        if limiter is not None:
+            await limiter.acquire(limiter.weight(1))
+        job = await self.client.getjob(*self._sources(), nohang=False,
+                                       withcounters=None, codec=False)
+        if limiter is not None and job is not None:
+            limiter.debit(limiter.weight(0, len(job.body)))
+        if job is not None:
+            await self.client.decode_jobs([job], self.codec)
         return job
 
+    def _sources(self):
+        return (self.name,)
+
     def get_nowait(self, withcounters=None):
         """Remove and return an item from the queue
 
@@ -73,16 +191,52 @@ class JobsQueue:
         """Put an item into the queue.
 
         If the queue is full, wait until a free slot is available before
-        adding item
+        adding item. Producers of the same queue share a
+        :class:`LengthWatcher` to wait for free slots. A large item is
+        offloaded to the blob store of the client once, and its blob is
+        deleted if the item is not added.
         """
         job = getattr(job, 'body', job)
+        codec = self._codec()
+        if codec:
+            job = codec.encode(job)
+        limiter = self.producer_limiter
+        if limiter is not None:
+            await limiter.acquire(limiter.weight(1, len(job)))
+        body = await self.client._offload_body(job)
+        if body is job:
+            return await self._put_when_free(body)
+        try:
+            return await self._put_when_free(body)
+        except Exception:
+            await self.client._discard_blobs([body])
+            raise
+
+    async def _put_when_free(self, job):
+        while True:
+            try:
+                return await self._put(job)
+            except ConnectionError as error:
+                if not self.maxsize or not str(error).startswith('MAXLEN'):
+                    raise
+            watcher = LengthWatcher.get(self.client, self.name,
+                                        loop=self.loop)
+            await watcher.wait(self.maxsize)
+
+    async def _put(self, job):
+        if self.profile is not None:
+            return await self.client.addjob(self.name, job, codec=False)
         response = await self.client.addjob(self.name, job, ms_timeout=0,
                                             replicate=None, delay=None,
                                             retry=None, ttl=None,
                                             asynchronous=False,
-                                            maxlen=self.maxsize or None)
+                                            maxlen=self.maxsize or None,
+                                            codec=False)
         return response
 
+    def _codec(self):
+        return self.client.codec if self.codec is None else self.codec
+
     def put_nowait(self, job, *, ms_timeout=0, replicate=None,
                    delay=None, retry=None, ttl=None, maxlen=None):
         """Put an item into the queue without blocking.
@@ -111,3 +265,70 @@ class JobsQueue:
         the queue.
         """
         raise NotImplementedError
+
+
+class ShardedQueue(JobsQueue):
+    """Logical queue spread over many physical queues
+
+    A hot queue concentrates on the nodes of its producers and consumers.
+    The items of a sharded queue are spread over ``shards`` queues, named
+    ``name:0`` to ``name:N-1``. Items put with the same key go to the same
+    shard, and items put without key are spread round-robin::
+
+        queue = ShardedQueue('events', client, 8)
+        await queue.put(event, key=user_id)
+        job = await queue.get()
+
+    Items are got from every shard with a single ``GETJOB FROM``, whose
+    order of shards is rotated at each call, so that no shard starves.
+
+    It accepts the same parameters than :class:`JobsQueue`, except
+    ``profile``. ``maxsize`` is the maxsize of every shard, and
+    ``producer_limiter`` is shared by every shard.
+
+    Attributes:
+        shards (list): the :class:`JobsQueue` of every shard
+    """
+
+    def __init__(self, queue, client, shards, *, maxsize=0, loop=None,
+                 producer_limiter=None, consumer_limiter=None, codec=None):
+        super().__init__(queue, client, maxsize=maxsize, loop=loop,
+                         producer_limiter=producer_limiter,
+                         consumer_limiter=consumer_limiter, codec=codec)
+        self.shards = [JobsQueue('%s:%d' % (queue, i), client,
+                                 maxsize=maxsize, loop=loop,
+                                 producer_limiter=producer_limiter,
+                                 codec=codec)
+                       for i in range(shards)]
+        self._next = 0
+        self._rotation = 0
+
+    def shard(self, key=None):
+        """Returns the shard of key, or the next one if key is None
+
+        Keys that are not bytes are hashed by their string value.
+        """
+        if key is None:
+            index = self._next
+            self._next = (index + 1) % len(self.shards)
+        else:
+            if not isinstance(key, (bytes, bytearray)):
+                key = str(key).encode('utf-8')
+            index = zlib.crc32(key) % len(self.shards)
+        return self.shards[index]
+
+    async def put(self, job, *, key=None, **options):
+        """Put an item into the shard of key
+
+        It accepts the same options than :meth:`JobsQueue.put`.
+
+        Parameters:
+            key (str): items with the same key go to the same shard
+        """
+        return await self.shard(key).put(job, **options)
+
+    def _sources(self):
+        names = [shard.name for shard in self.shards]
+        index = self._rotation
+        self._rotation = (index + 1) % len(names)
+        return names[index:] + names[:index]
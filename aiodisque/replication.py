@@ -0,0 +1,122 @@
+import asyncio
+
+__all__ = ['ReplicationPolicy']
+
+
+class ReplicationPolicy:
+    """Relaxes the replication of jobs while ADDJOB is too slow
+
+    It watches the latency of synchronous ADDJOB commands against a
+    ``target``, with an exponentially weighted moving average. Once the
+    target is exceeded, the policy becomes ``degraded``, and the jobs added
+    to ``tolerant`` queues are added with ``ASYNC``, or with ``replicate``
+    copies when it is given. Jobs of the other queues are not changed.
+
+    While degraded, one job of a tolerant queue is added unchanged every
+    ``probe_interval`` seconds, in order to keep measuring the synchronous
+    latency. The policy goes back to ``normal`` once the latency falls
+    below ``recovery`` times the target. Only the jobs added as asked, like
+    probes, are measured: degraded jobs are faster by design.
+
+    Give it to a client, so that :meth:`~Disque.addjob` and
+    :meth:`JobsQueue.put` follow it::
+
+        client = Disque(address)
+        client.replication = ReplicationPolicy(0.05, tolerant=['metrics'])
+
+    Parameters:
+        target (float): latency of ADDJOB not to exceed, in seconds
+        tolerant (list): names of the queues that tolerate a weaker
+                         replication
+        replicate (int): replication level used while degraded, instead
+                         of ``ASYNC``
+        recovery (float): part of the target under which the policy
+                          recovers
+        smoothing (float): weight of the last latency in the average
+        probe_interval (float): seconds between two probes while degraded
+        loop (EventLoop): asyncio loop
+
+    Attributes:
+        state (str): one of ``normal`` or ``degraded``
+        latency (float): average latency of synchronous ADDJOB
+        switches (int): number of times the state changed
+        degraded_jobs (int): number of jobs added with a weaker replication
+    """
+
+    def __init__(self, target, *, tolerant=(), replicate=None, recovery=0.8,
+                 smoothing=0.2, probe_interval=1, loop=None):
+        self.target = target
+        self.tolerant = set(tolerant)
+        self.replicate = replicate
+        self.recovery = recovery
+        self.smoothing = smoothing
+        self.probe_interval = probe_interval
+        self.loop = loop
+        self.state = 'normal'
+        self.latency = None
+        self.switches = 0
+        self.degraded_jobs = 0
+        self._probed_at = None
+
+    @property
+    def _loop(self):
+        return self.loop or asyncio.get_event_loop()
+
+    def tolerate(self, *queues):
+        """Marks queues as tolerant to a weaker replication
+        """
+        self.tolerant.update(queues)
+
+    def adapt(self, queue, replicate=None):
+        """Returns the replication of a job added synchronously to queue
+
+        Parameters:
+            queue (str): name of the queue
+            replicate (int): replication level asked by the producer
+        Returns:
+            tuple: the ``(replicate, asynchronous)`` options to use
+        """
+        if self.state == 'normal' or queue not in self.tolerant:
+            return replicate, False
+        now = self._loop.time()
+        if now - self._probed_at >= self.probe_interval:
+            self._probed_at = now
+            return replicate, False
+        if self.replicate is None:
+            adapted = replicate, True
+        elif replicate is None:
+            adapted = self.replicate, False
+        else:
+            adapted = min(replicate, self.replicate), False
+        if adapted != (replicate, False):
+            self.degraded_jobs += 1
+        return adapted
+
+    def record(self, elapsed):
+        """Records the latency of a synchronous ADDJOB, and switches state
+        """
+        if self.latency is None:
+            self.latency = elapsed
+        else:
+            self.latency += self.smoothing * (elapsed - self.latency)
+        if self.state == 'normal' and self.latency > self.target:
+            self._switch('degraded')
+        elif self.state == 'degraded' and \
+                self.latency <= self.target * self.recovery:
+            self._switch('normal')
+
+    def _switch(self, state):
+        self.state = state
+        self.switches += 1
+        self._probed_at = self._loop.time()
+
+    async def measure(self, coro):
+        """Awaits an ADDJOB command, and records its latency
+
+        Failed commands are recorded too, as they mostly failed on timeout.
+        """
+        started = self._loop.time()
+        try:
+            return await coro
+        finally:
+            self.record(self._loop.time() - started)
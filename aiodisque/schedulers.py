@@ -0,0 +1,144 @@
+import asyncio
+import heapq
+import itertools
+import math
+
+__all__ = ['DelayScheduler']
+
+
+class DelayScheduler:
+    """Delays jobs with a sub-second resolution
+
+    ``DELAY`` of :meth:`Disque.addjob` is counted in whole seconds. The
+    scheduler holds the jobs due within ``horizon`` seconds, and adds them
+    once they fall due. Longer delays are split: the fraction of second is
+    held, then the job is added with the whole seconds as ``DELAY``::
+
+        scheduler = DelayScheduler(client)
+        scheduler.schedule('retries', body, 0.25)
+        await scheduler.close()
+
+    Pending jobs are kept into a heap, watched by a single timer, so that
+    many of them cost no more than one callback. Jobs falling due together
+    are pipelined. On :meth:`close`, the pending jobs are added at once,
+    with their remaining delay rounded up to the second.
+
+    Parameters:
+        client (Disque): disque client
+        horizon (float): delays below that are held by the scheduler
+        loop (EventLoop): asyncio loop
+
+    Attributes:
+        added (int): number of jobs added
+        failed (int): number of jobs refused
+    """
+
+    def __init__(self, client, *, horizon=5, loop=None):
+        self.client = client
+        self.horizon = horizon
+        self.loop = loop or asyncio.get_event_loop()
+        self.added = 0
+        self.failed = 0
+        self._heap = []
+        self._counter = itertools.count()
+        self._handle = None
+        self._sending = set()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def schedule(self, queue, job, delay, **options):
+        """Adds a job to queue after delay seconds
+
+        It accepts the same options than :meth:`Disque.addjob`, except
+        ``delay``. Cancel the returned future to cancel the job.
+
+        Returns:
+            Future: the id of the added job
+        """
+        future = self.loop.create_future()
+        if delay >= self.horizon:
+            options['delay'] = int(delay)
+            delay -= int(delay)
+        entry = (queue, job, options, future)
+        if delay <= 0:
+            self._send_soon([entry])
+            return future
+        due = self.loop.time() + delay
+        heapq.heappush(self._heap, (due, next(self._counter), entry))
+        if self._heap[0][2] is entry:
+            self._reschedule()
+        return future
+
+    async def addjob(self, queue, job, delay, **options):
+        """Adds a job to queue after delay seconds, and returns its id
+        """
+        return await self.schedule(queue, job, delay, **options)
+
+    def _reschedule(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if self._heap:
+            self._handle = self.loop.call_at(self._heap[0][0], self._fire)
+
+    def _fire(self):
+        self._handle = None
+        now = self.loop.time()
+        entries = []
+        while self._heap and self._heap[0][0] <= now:
+            entries.append(heapq.heappop(self._heap)[2])
+        self._reschedule()
+        self._send_soon(entries)
+
+    def _send_soon(self, entries):
+        if entries:
+            task = asyncio.ensure_future(self._send(entries), loop=self.loop)
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _send(self, entries):
+        groups = {}
+        for queue, job, options, future in entries:
+            if not future.done():
+                key = tuple(sorted(options.items()))
+                groups.setdefault(key, []).append((queue, job, future))
+        for options, group in groups.items():
+            jobs = [(queue, job) for queue, job, future in group]
+            try:
+                responses = await self.client.addjob_multi(jobs,
+                                                           **dict(options))
+            except Exception as error:
+                responses = [error] * len(group)
+            for (queue, job, future), response in zip(group, responses):
+                self._resolve(future, response)
+
+    def _resolve(self, future, response):
+        if isinstance(response, Exception):
+            self.failed += 1
+            if not future.done():
+                future.set_exception(response)
+                # failures are counted, awaiting the future is optional
+                future.exception()
+        else:
+            self.added += 1
+            if not future.done():
+                future.set_result(response)
+
+    async def close(self):
+        """Adds the pending jobs at once, and waits for them
+        """
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        now = self.loop.time()
+        entries = []
+        while self._heap:
+            due, _, (queue, job, options, future) = heapq.heappop(self._heap)
+            delay = options.get('delay', 0) + math.ceil(due - now)
+            if delay > 0:
+                options['delay'] = delay
+            entries.append((queue, job, options, future))
+        self._send_soon(entries)
+        while self._sending:
+            await asyncio.wait(list(self._sending))
@@ -1,7 +1,9 @@
 from .addresses_util import *
+from .batches_util import *
 from itertools import zip_longest
 
-__all__ = ['parse_address', 'encode_command']
+__all__ = ['parse_address', 'encode_command', 'encode_arguments',
+           'CommandTemplate']
 
 
 def grouper(n, iterable, fillvalue=None):
@@ -26,6 +28,16 @@ def _bytes_len(sized):
 def encode_command(*args):
     """Encodes arguments into redis bulk-strings array
 
+    Raises TypeError if any of args not of bytes, str, int or float type.
+    """
+    return b'*' + _bytes_len(args) + b'\r\n' + encode_arguments(*args)
+
+
+def encode_arguments(*args):
+    """Encodes arguments into redis bulk-strings, without the array header
+
+    It allows to encode once the parts that are shared by many commands.
+
     Raises TypeError if any of args not of bytes, str, int or float type.
     """
     buf = bytearray()
@@ -33,7 +45,6 @@ def encode_command(*args):
     def add(data):
         return buf.extend(data + b'\r\n')
 
-    add(b'*' + _bytes_len(args))
     for arg in args:
         if type(arg) in _converters:
             barg = _converters[type(arg)](arg)
@@ -43,3 +54,39 @@ def encode_command(*args):
         raise TypeError("Argument {!r} expected to be of bytes,"
                         " str, int or float type".format(arg))
     return bytes(buf)
+
+
+class CommandTemplate:
+    """Command whose constant arguments are encoded once
+
+    The variable arguments are spliced between ``prefix`` and ``suffix``::
+
+        template = CommandTemplate('ADDJOB', 'queue', suffix=[0, 'ASYNC'])
+        message = template.encode('body')
+        assert message == encode_command('ADDJOB', 'queue', 'body',
+                                         0, 'ASYNC')
+
+    Parameters:
+        *prefix: arguments put before the variable ones
+        suffix (list): arguments put after the variable ones
+    """
+
+    def __init__(self, *prefix, suffix=()):
+        self.prefix = prefix
+        self.suffix = tuple(suffix)
+        self._prefix = encode_arguments(*self.prefix)
+        self._suffix = encode_arguments(*self.suffix)
+        self._size = len(self.prefix) + len(self.suffix)
+
+    def encode(self, *values):
+        """Encodes the command with values as variable arguments
+        """
+        return b''.join([b'*%d\r\n' % (self._size + len(values)),
+                         self._prefix,
+                         encode_arguments(*values),
+                         self._suffix])
+
+    def arguments(self, *values):
+        """Returns the whole list of arguments
+        """
+        return self.prefix + values + self.suffix
@@ -1,6 +1,8 @@
+import asyncio
+import socket
 from functools import singledispatch
 
-__all__ = ['Address', 'AddressError', 'parse_address']
+__all__ = ['Address', 'AddressError', 'parse_address', 'is_local_address']
 
 
 class Address:
@@ -95,3 +97,34 @@ def parse_addr_tuple(address, *, host=None, port=None, **kwargs):
     except Exception as error:
         raise AddressError(address) from error
     return Address(proto=proto, address=address)
+
+
+_local_hosts = None
+
+
+async def local_hosts(*, loop=None):
+    """Returns the hosts names and ip addresses of the local host
+
+    The host name is resolved once, without blocking the loop.
+    """
+    global _local_hosts
+    if _local_hosts is None:
+        loop = loop or asyncio.get_event_loop()
+        hostname = socket.gethostname()
+        hosts = {'localhost', '0.0.0.0', '::', '::1', hostname}
+        try:
+            infos = await loop.getaddrinfo(hostname, None)
+        except OSError:
+            infos = []
+        hosts.update(info[4][0] for info in infos)
+        _local_hosts = frozenset(hosts)
+    return _local_hosts
+
+
+async def is_local_address(address, *, loop=None):
+    """Tells if a tcp address points to the local host
+    """
+    if address.proto != 'tcp':
+        return False
+    host = address.address[0]
+    return host.startswith('127.') or host in await local_hosts(loop=loop)
@@ -0,0 +1,93 @@
+import asyncio
+
+__all__ = ['Batcher']
+
+
+class Batcher:
+    """Buffers items, and processes them by batches
+
+    Items are processed together once the batch is full, ``max_delay``
+    seconds after its first item, or on :meth:`flush`. Every item of a
+    batch gets the result of :meth:`process`, or its error.
+
+    Subclasses implement :meth:`process`, and may override :meth:`full`.
+
+    Parameters:
+        max_delay (float): maximum seconds an item is buffered
+        loop (EventLoop): asyncio loop
+    """
+
+    def __init__(self, *, max_delay, loop=None):
+        self.max_delay = max_delay
+        self.loop = loop or asyncio.get_event_loop()
+        self._items = []
+        self._size = 0
+        self._future = None
+        self._handle = None
+        self._flushing = set()
+
+    def push(self, item, size=0):
+        """Buffers an item of size bytes
+
+        Returns:
+            Future: the result of the batch
+        """
+        self._items.append(item)
+        self._size += size
+        if self._future is None:
+            self._future = self.loop.create_future()
+        future = self._future
+        if self.full(len(self._items), self._size):
+            self._flush_soon()
+        elif self._handle is None:
+            self._handle = self.loop.call_later(self.max_delay,
+                                                self._flush_soon)
+        return future
+
+    def full(self, count, size):
+        """Tells if a batch of count items, of size bytes, is full
+        """
+        raise NotImplementedError
+
+    async def process(self, items):
+        """Processes a batch, and returns its result
+        """
+        raise NotImplementedError
+
+    def _flush_soon(self):
+        task = asyncio.ensure_future(self._send(*self._take()),
+                                     loop=self.loop)
+        self._flushing.add(task)
+        task.add_done_callback(self._flushing.discard)
+
+    def _take(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        items, future = self._items, self._future
+        self._items, self._size, self._future = [], 0, None
+        return items, future
+
+    async def flush(self):
+        """Processes the buffered items now
+        """
+        await self._send(*self._take())
+
+    async def _send(self, items, future):
+        if not items:
+            return
+        try:
+            response = await self.process(items)
+        except Exception as error:
+            future.set_exception(error)
+            # the error is raised to every caller that awaits it
+            future.exception()
+        else:
+            future.set_result(response)
+
+    async def close(self):
+        """Processes the buffered items, and waits for the pending batches
+        """
+        await self.flush()
+        while self._flushing:
+            await asyncio.wait(list(self._flushing))
@@ -11,7 +11,7 @@ setup(
     description='Asyncio Disque client',
     packages=find_packages(),
     install_requires=[
-        'hiredis'
+        'hiredis>=1.0'
     ],
     classifiers=[
         "Development Status :: 5 - Production/Stable",
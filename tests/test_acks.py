@@ -0,0 +1,53 @@
+import asyncio
+import pytest
+from aiodisque import Disque, AckBatcher
+
+
+class Client:
+
+    def __init__(self):
+        self.calls = []
+
+    async def ackjob(self, *jobs):
+        self.calls.append(('ackjob', jobs))
+        return len(jobs)
+
+    async def fastack(self, *jobs):
+        self.calls.append(('fastack', jobs))
+        return len(jobs)
+
+
+@pytest.mark.asyncio
+async def test_batch(event_loop):
+    client = Client()
+    batcher = AckBatcher(client, max_size=3, loop=event_loop)
+    results = await asyncio.gather(*[batcher.ack('D-%d' % i)
+                                     for i in range(4)])
+    assert results == [3, 3, 3, 1]
+    assert client.calls == [('ackjob', ('D-0', 'D-1', 'D-2')),
+                            ('ackjob', ('D-3',))]
+    assert batcher.commands == 2
+
+
+@pytest.mark.asyncio
+async def test_flush(event_loop):
+    client = Client()
+    batcher = AckBatcher(client, fast=True, max_delay=60, loop=event_loop)
+    future = batcher.ack_nowait('D-1')
+    await batcher.flush()
+    assert future.result() == 1
+    batcher.ack_nowait('D-2')
+    await batcher.close()
+    assert client.calls == [('fastack', ('D-1',)), ('fastack', ('D-2',))]
+
+
+@pytest.mark.asyncio
+async def test_client(node, event_loop):
+    client = Disque(node.port, loop=event_loop)
+    for i in range(5):
+        await client.addjob('q', 'job-%d' % i)
+    jobs = await client.getjob('q', count=5)
+    batcher = AckBatcher(client, loop=event_loop)
+    results = await asyncio.gather(*[batcher.ack(job) for job in jobs])
+    assert results == [5] * 5
+    assert batcher.commands == 1
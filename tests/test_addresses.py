@@ -1,5 +1,6 @@
 import pytest
 from aiodisque.util import parse_address, Address, AddressError
+from aiodisque.util import is_local_address
 
 ok = [
     ('1.2.3.4', Address(proto='tcp', address=('1.2.3.4', 7711))),
@@ -31,3 +32,15 @@ def test_parse_ok(input, expected):
 def test_parse_fail(input):
     with pytest.raises(AddressError):
         parse_address(input)
+
+
+@pytest.mark.asyncio
+async def test_is_local_address(event_loop):
+    address = parse_address('127.0.0.1:7711')
+    assert await is_local_address(address)
+    address = parse_address('localhost:7711')
+    assert await is_local_address(address)
+    address = parse_address('/tmp/disque.sock')
+    assert not await is_local_address(address)
+    address = parse_address('192.0.2.1:7711')
+    assert not await is_local_address(address)
@@ -0,0 +1,78 @@
+import os
+import pytest
+from aiodisque import Disque, Codec, FileBlobStore, BlobReference, Job
+from aiodisque import ConnectionError
+
+
+@pytest.mark.asyncio
+async def test_file_store(event_loop, tmpdir):
+    store = FileBlobStore(str(tmpdir), threshold=10, loop=event_loop)
+    key = await store.put(b'data')
+    assert await store.get(key) == b'data'
+    await store.delete(key)
+    assert os.listdir(str(tmpdir)) == []
+
+    assert not store.offloads('short')
+    assert store.offloads('long' * 10)
+    body = await store.offload('long' * 10)
+    assert body[:2] == b'\xbfR'
+    assert await store.get(body[2:].decode('utf-8')) == b'long' * 10
+
+
+@pytest.mark.asyncio
+async def test_client(node, event_loop, tmpdir):
+    store = FileBlobStore(str(tmpdir), threshold=10, loop=event_loop)
+    client = Disque(node.port, loop=event_loop, blobs=store,
+                    codec=Codec('json'))
+    await client.addjob('q', {'foo': 'bar' * 10})
+    assert len(os.listdir(str(tmpdir))) == 1
+    job = await client.getjob('q')
+    assert isinstance(job.body, BlobReference)
+    assert await job.body.read() == {'foo': 'bar' * 10}
+    await client.ackjob(job)
+    assert os.listdir(str(tmpdir)) == []
+
+
+@pytest.mark.asyncio
+async def test_refused(node, event_loop, tmpdir):
+    store = FileBlobStore(str(tmpdir), threshold=10, loop=event_loop)
+    client = Disque(node.port, loop=event_loop, blobs=store)
+    await client.addjob('q', 'first' * 10)
+    with pytest.raises(ConnectionError):
+        await client.addjob('q', 'second' * 10, maxlen=1)
+    responses = await client.addjob_multi([('q', 'third' * 10)], maxlen=1)
+    assert isinstance(responses[0], ConnectionError)
+    assert len(os.listdir(str(tmpdir))) == 1
+
+
+@pytest.mark.asyncio
+async def test_invalid_key(event_loop, tmpdir):
+    store = FileBlobStore(str(tmpdir), loop=event_loop)
+    assert store.valid_key(await store.put(b'data'))
+    assert not store.valid_key('/etc/passwd')
+    assert not store.valid_key('../' + 'a' * 29)
+    with pytest.raises(ValueError):
+        await store.get('/etc/passwd')
+
+    client = Disque('127.0.0.1:1', loop=event_loop, blobs=store)
+    job = Job('q', 'D-1', '\udcbfR/etc/passwd')
+    await client.decode_jobs([job])
+    assert job.body == '\udcbfR/etc/passwd'
+
+
+@pytest.mark.asyncio
+async def test_failed_window(event_loop, tmpdir):
+    store = FileBlobStore(str(tmpdir), threshold=10, loop=event_loop)
+    client = Disque('127.0.0.1:1', loop=event_loop, blobs=store)
+    sent = []
+
+    async def execute_messages(messages):
+        if sent:
+            raise ConnectionError('closed')
+        sent.append(messages)
+        return ['D-%d' % i for i in range(len(messages))]
+
+    client.execute_messages = execute_messages
+    responses = await client.addjob_many('q', ['long' * 10] * 3, window=2)
+    assert isinstance(responses[2], ConnectionError)
+    assert len(os.listdir(str(tmpdir))) == 2
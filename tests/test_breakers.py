@@ -0,0 +1,82 @@
+import asyncio
+import pytest
+from aiodisque import CircuitBreaker, CircuitOpenError
+from aiodisque.connections import ClosedConnectionError
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 0
+
+    def time(self):
+        return self.now
+
+
+def test_trip():
+    clock = Clock()
+    breaker = CircuitBreaker(min_calls=4, error_rate=.5, loop=clock)
+    breaker.record(.01)
+    breaker.record(.01, failed=True)
+    breaker.record(.01)
+    assert breaker.state == 'closed'
+    breaker.record(.01, failed=True)
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+
+
+def test_latency():
+    clock = Clock()
+    breaker = CircuitBreaker(min_calls=2, latency=.1, loop=clock)
+    breaker.record(.5)
+    breaker.record(.5)
+    assert breaker.state == 'open'
+
+
+def test_half_open():
+    clock = Clock()
+    breaker = CircuitBreaker(min_calls=1, reset_timeout=5, probe_interval=1,
+                             loop=clock)
+    breaker.record(.01, failed=True)
+    assert breaker.state == 'open'
+
+    clock.now = 5
+    assert breaker.state == 'half-open'
+    assert breaker.allow()
+    assert not breaker.allow()
+    clock.now = 6
+    assert breaker.allow()
+
+    breaker.record(.01, failed=True)
+    assert breaker.state == 'open'
+
+    clock.now = 11
+    assert breaker.allow()
+    breaker.record(.01)
+    assert breaker.state == 'closed'
+    assert breaker.trips == 2
+
+
+@pytest.mark.asyncio
+async def test_call(event_loop):
+    breaker = CircuitBreaker(min_calls=1, loop=event_loop)
+
+    async def failing():
+        raise ClosedConnectionError('closed connection')
+
+    with pytest.raises(ClosedConnectionError):
+        await breaker.call(failing)
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(failing)
+
+
+@pytest.mark.asyncio
+async def test_call_latency(event_loop):
+    breaker = CircuitBreaker(min_calls=1, latency=.01, loop=event_loop)
+
+    async def slow():
+        await asyncio.sleep(1)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await breaker.call(slow)
+    assert breaker.state == 'open'
@@ -0,0 +1,51 @@
+import pytest
+from aiodisque import Disque, Codec, ChunkAssembler, ConnectionError
+from aiodisque.chunks import encode_chunks, is_chunk, parse_chunk
+
+GROUP = '0123456789abcdef0123456789abcdef'
+
+
+def test_encode_chunks():
+    chunks = encode_chunks('foobar', GROUP, 4)
+    assert len(chunks) == 2
+    assert all(is_chunk(chunk) for chunk in chunks)
+    assert parse_chunk(chunks[0]) == (GROUP, 0, 2, b'foob')
+    assert parse_chunk(chunks[1]) == (GROUP, 1, 2, b'ar')
+    assert parse_chunk(chunks[1].decode('utf-8', 'surrogateescape')) \
+        == (GROUP, 1, 2, b'ar')
+    assert not is_chunk('foobar')
+
+
+@pytest.mark.asyncio
+async def test_assemble(node, event_loop):
+    client = Disque(node.port, loop=event_loop, codec=Codec('json'))
+    ids = await client.addjob_chunked('q', {'foo': 'bar' * 100},
+                                      chunk_size=100)
+    assert len(ids) == 4
+    assert await client.qlen('q') == 1
+
+    assembler = ChunkAssembler(client, 'q')
+    job = await assembler.get()
+    assert job.id == ids[0]
+    assert job.body == {'foo': 'bar' * 100}
+    assert len(job.chunks) == 4
+    assert await client.ackjob(job) == 4
+
+
+@pytest.mark.asyncio
+async def test_refused(event_loop):
+    client = Disque('127.0.0.1:1', loop=event_loop)
+    batches = []
+
+    async def execute_messages(messages):
+        batches.append(messages)
+        if b'FASTACK' in messages[0]:
+            return [2]
+        if b'\r\n$1\r\nq\r\n' in messages[0]:
+            return [ConnectionError('MAXLEN too long')]
+        return ['D-%d' % i for i in range(len(messages))]
+
+    client.execute_messages = execute_messages
+    with pytest.raises(ConnectionError):
+        await client.addjob_chunked('q', 'foobarbaz', chunk_size=4)
+    assert batches[-1][0].startswith(b'*3\r\n$7\r\nFASTACK\r\n')
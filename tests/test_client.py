@@ -1,6 +1,7 @@
 import asyncio
 import pytest
-from aiodisque import Disque, ConnectionError, Job
+from aiodisque import Disque, ConnectionError, Job, JobProfile
+from aiodisque.connections import ClosedConnectionError
 
 
 @pytest.mark.asyncio
@@ -380,3 +381,77 @@ class Wrapper:
         writer.write(data)
         await writer.drain()
         writer.close()
+
+
+@pytest.mark.asyncio
+async def test_prefer_unix(node, event_loop):
+    client = Disque(node.port, loop=event_loop, prefer_unix=True)
+    response = await client.hello()
+    assert 'id' in response
+    assert client.unix_socket == node.socket
+
+
+@pytest.mark.asyncio
+async def test_addjob_many(node, event_loop):
+    client = Disque(node.port, loop=event_loop)
+    job_ids = await client.addjob_many('q', ['job-%s' % i for i in range(10)],
+                                       retry=0, window=3)
+    assert len(job_ids) == 10
+    assert all(job_id.startswith('D-') for job_id in job_ids)
+    assert await client.qlen('q') == 10
+
+    responses = await client.addjob_multi([('q', 'job'), ('r', 'job')],
+                                          maxlen=10)
+    assert isinstance(responses[0], ConnectionError)
+    assert responses[1].startswith('D-')
+
+
+@pytest.mark.asyncio
+async def test_publish(node, event_loop):
+    client = Disque(node.port, loop=event_loop)
+    await client.addjob('r', 'job')
+    response = await client.publish('event', ['q', 'r', 's'], maxlen=1)
+    assert set(response) == {'q', 'r', 's'}
+    assert response['q'].startswith('D-')
+    assert isinstance(response['r'], ConnectionError)
+    assert response['s'].startswith('D-')
+
+
+@pytest.mark.asyncio
+async def test_profile(node, event_loop):
+    client = Disque(node.port, loop=event_loop)
+    profile = client.register_profile('q', retry=0, maxlen=1)
+    assert isinstance(profile, JobProfile)
+    job_id = await client.addjob('q', 'job')
+    assert job_id.startswith('D-')
+    with pytest.raises(ConnectionError):
+        await client.addjob('q', 'job')
+    job = await client.getjob('q')
+    assert job.id == job_id
+
+
+@pytest.mark.asyncio
+async def test_addjob_many_errors(event_loop):
+    client = Disque('127.0.0.1:1', loop=event_loop)
+    sent = []
+
+    async def execute_messages(messages):
+        if sent:
+            raise ClosedConnectionError('closed')
+        sent.append(messages)
+        return ['D-%d' % i for i in range(len(messages))]
+
+    client.execute_messages = execute_messages
+    responses = await client.addjob_many('q', ['a', 'b', 'c'], window=2)
+    assert responses[:2] == ['D-0', 'D-1']
+    assert isinstance(responses[2], ClosedConnectionError)
+
+
+@pytest.mark.asyncio
+async def test_getjob_blocking(node, event_loop):
+    client = Disque(node.port, loop=event_loop)
+    getter = asyncio.ensure_future(client.getjob('q', timeout=5000))
+    await asyncio.sleep(.05)
+    job_id = await asyncio.wait_for(client.addjob('q', 'job'), 1)
+    job = await getter
+    assert job.id == job_id
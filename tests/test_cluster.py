@@ -0,0 +1,163 @@
+import asyncio
+import pytest
+from aiodisque import Cluster, ClusterNode, Codec, DedupWindow
+
+
+@pytest.mark.asyncio
+async def test_discover(node, event_loop):
+    client = Cluster([node.port], loop=event_loop)
+    nodes = await client.discover()
+    assert len(nodes) == 1
+    for node_id, cluster_node in nodes.items():
+        assert isinstance(cluster_node, ClusterNode)
+        assert cluster_node.id == node_id
+
+
+@pytest.mark.asyncio
+async def test_addjob(node, event_loop):
+    client = Cluster([node.port], loop=event_loop)
+    job_id = await client.addjob('q', 'job')
+    assert job_id.startswith('D-')
+    job = await client.getjob('q')
+    assert job.id == job_id
+
+
+@pytest.mark.asyncio
+async def test_locality(node, event_loop):
+    client = Cluster([node.port], loop=event_loop, locality=True)
+    node_ids = await client.locate_consumers('q')
+    assert node_ids == set()
+
+    await client.addjob('q', 'job')
+    job = await client.getjob('q', nohang=True)
+    assert job
+    node_ids = await client.locate_consumers('q')
+    assert node_ids == set(client.nodes)
+
+
+
+@pytest.mark.asyncio
+async def test_balance(node, event_loop):
+    client = Cluster([node.port], loop=event_loop, balance=True)
+    for i in range(10):
+        await client.addjob('q', 'job-%s' % i)
+    stats = client.stats()
+    assert sum(stat['selections'] for stat in stats.values()) == 10
+    for stat in stats.values():
+        assert stat['outstanding'] == 0
+        assert stat['rtt'] > 0
+
+
+@pytest.mark.asyncio
+async def test_topology_cache(node, event_loop, tmpdir):
+    filename = str(tmpdir.join('topology.json'))
+    client = Cluster([node.port], loop=event_loop, topology_cache=filename)
+    nodes = await client.discover()
+    client.close()
+    assert client.load_topology()
+
+    client = Cluster([], loop=event_loop, topology_cache=filename)
+    assert set(await client.discover()) == set(nodes)
+
+
+@pytest.mark.asyncio
+async def test_hedge(node, event_loop):
+    client = Cluster([node.port], loop=event_loop, hedge=True)
+    await client.addjob('q', 'job')
+    for i in range(30):
+        assert await client.qlen('q') == 1
+    assert client.hedging_delay() < client.hedge_delay
+
+
+@pytest.mark.asyncio
+async def test_publish(node, event_loop):
+    client = Cluster([node.port], loop=event_loop, balance=True)
+    response = await client.publish('event', ['q', 'r', 's'])
+    assert set(response) == {'q', 'r', 's'}
+    for job_id in response.values():
+        assert job_id.startswith('D-')
+
+
+def hello_response(*nodes):
+    return {'format': 1, 'id': nodes[0][0],
+            'nodes': [{'id': id, 'host': '127.0.0.1', 'port': port,
+                       'priority': priority}
+                      for id, port, priority in nodes]}
+
+
+@pytest.mark.asyncio
+async def test_refresh(event_loop):
+    client = Cluster(['127.0.0.1:1'], loop=event_loop)
+    client.update_nodes(hello_response(('a', '1', '1')))
+    assert (await client.best_node()).id == 'a'
+
+    async def hello():
+        return hello_response(('a', '1', '100'), ('b', '2', '1'))
+
+    client.nodes['a'].client.hello = hello
+    await client.refresh()
+    assert client.nodes['a'].priority == 100
+    assert not client.nodes['a'].available
+    assert (await client.best_node()).id == 'b'
+    client.close()
+
+
+@pytest.mark.asyncio
+async def test_cache_timeout(event_loop, tmpdir):
+    filename = str(tmpdir.join('topology.json'))
+    client = Cluster(['127.0.0.1:2'], loop=event_loop, topology_cache=filename)
+    client.update_nodes(hello_response(('a', '1', '1')))
+    client.close()
+
+    client = Cluster(['127.0.0.1:2'], loop=event_loop, topology_cache=filename)
+    client.cache_timeout = .05
+    node_client = client.node_client
+
+    def patched(address):
+        result = node_client(address)
+
+        async def hello():
+            if address != '127.0.0.1:2':
+                await asyncio.sleep(10)
+            return hello_response(('b', '2', '1'))
+
+        result.hello = hello
+        return result
+
+    client.node_client = patched
+    started = event_loop.time()
+    assert set(await client.discover()) == {'b'}
+    assert event_loop.time() - started < 1
+    client.close()
+
+
+@pytest.mark.asyncio
+async def test_hedge_cancelled(event_loop):
+    client = Cluster(['127.0.0.1:1'], loop=event_loop, hedge=True)
+    client.update_nodes(hello_response(('a', '1', '1'), ('b', '2', '1')))
+    client.hedge_delay = .01
+
+    async def execute_command(*args):
+        await asyncio.sleep(10)
+
+    for node in client.nodes.values():
+        node.client.execute_command = execute_command
+    task = asyncio.ensure_future(
+        client._execute_hedged(client.nodes['a'], 'QLEN', 'q'))
+    await asyncio.sleep(.05)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    await asyncio.sleep(0)
+    assert [node.outstanding for node in client.nodes.values()] == [0, 0]
+    client.close()
+
+
+def test_options(event_loop):
+    codec = Codec('json')
+    dedup = DedupWindow(loop=event_loop)
+    client = Cluster(['127.0.0.1:1'], loop=event_loop, codec=codec,
+                     dedup=dedup, max_in_flight=10)
+    assert client.codec is codec
+    assert client.dedup is dedup
+    assert client.deferred.max_in_flight == 10
@@ -0,0 +1,88 @@
+import pytest
+from aiodisque import Disque, Job, JobsQueue, Codec, register_serializer
+from concurrent.futures import ThreadPoolExecutor
+from aiodisque.connections import parser
+
+
+def read(body):
+    reader = parser()
+    reader.feed(b'$%d\r\n%s\r\n' % (len(body), body))
+    return reader.gets()
+
+
+def test_text():
+    codec = Codec()
+    assert codec.encode('foo') == 'foo'
+    assert codec.decode('foo') == 'foo'
+
+
+def test_json():
+    codec = Codec('json')
+    body = codec.encode({'foo': 'bar'})
+    assert body == b'\x90{"foo":"bar"}'
+    assert codec.decode(read(body)) == {'foo': 'bar'}
+    assert Codec().decode(body) == body
+    assert Codec(accept=['json']).decode(body) == {'foo': 'bar'}
+
+
+class Payload:
+
+    def __reduce__(self):
+        return (exec, ('raise RuntimeError("unpickled")',))
+
+
+def test_accept():
+    body = read(Codec('pickle').encode(Payload()))
+    assert Codec('json').decode(body) == body
+    assert Codec('json', accept=['text']).decode(body) == body
+    with pytest.raises(RuntimeError):
+        Codec('json', accept=['pickle']).decode(body)
+
+
+def test_compression():
+    codec = Codec('text', compression='zlib', threshold=10)
+    assert codec.encode('short') == 'short'
+    body = codec.encode('long' * 100)
+    assert body[0] == 0x81
+    assert len(body) < 400
+    assert codec.decode(read(body)) == 'long' * 100
+
+    codec = Codec('pickle', compression='lzma', threshold=10)
+    body = codec.encode(['long'] * 100)
+    assert body[0] == 0x9a
+    assert codec.decode(read(body)) == ['long'] * 100
+
+
+def test_register():
+    register_serializer('upper', 7, lambda obj: obj.upper().encode('utf-8'),
+                        lambda data: bytes(data).decode('utf-8').lower())
+    codec = Codec('upper')
+    body = codec.encode('foo')
+    assert body == b'\xb8FOO'
+    assert codec.decode(body) == 'foo'
+
+
+@pytest.mark.asyncio
+async def test_offload(event_loop):
+    executor = ThreadPoolExecutor(1)
+    codec = Codec('json', offload_threshold=20, executor=executor)
+    jobs = [Job('q', 'D-1', read(codec.encode('small'))),
+            Job('q', 'D-2', read(codec.encode('large' * 10))),
+            Job('q', 'D-3', 'plain' * 10)]
+    await codec.decode_jobs(jobs)
+    assert [job.body for job in jobs] == ['small', 'large' * 10, 'plain' * 10]
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_client(node, event_loop):
+    codec = Codec('json', compression='zlib', threshold=10)
+    client = Disque(node.port, loop=event_loop, codec=codec)
+    await client.addjob('q', {'foo': 'bar' * 100})
+    job = await client.getjob('q')
+    assert job.body == {'foo': 'bar' * 100}
+
+    queue = JobsQueue('q', client, codec=Codec('pickle'), loop=event_loop)
+    await queue.put({'foo', 'bar'})
+    job = await queue.get()
+    assert job.body == {'foo', 'bar'}
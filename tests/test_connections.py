@@ -1,3 +1,4 @@
+import asyncio
 import pytest
 from aiodisque import connect, Connection, ConnectionError
 from unittest.mock import Mock
@@ -55,3 +56,37 @@ async def test_close_callback(node, event_loop):
     connection.close()
     assert spy.called
     assert connection.closed
+
+
+@pytest.mark.asyncio
+async def test_write_limits(node, event_loop):
+    connection = await connect(node.port, loop=event_loop,
+                               high_water=1024, low_water=256)
+    transport = connection._writer.transport
+    assert transport.get_write_buffer_limits() == (256, 1024)
+
+    response = await connection.send_command('ADDJOB', 'q', 'x' * 65536, 0)
+    assert response.startswith('D-')
+    assert connection.bytes_written > 65536
+    assert connection.bytes_buffered == 0
+
+
+@pytest.mark.asyncio
+async def test_pipelined_callers(event_loop):
+
+    async def handle(reader, writer):
+        # the first command is answered once the second has been received
+        await reader.readuntil(b'first\r\n')
+        await reader.readuntil(b'second\r\n')
+        writer.write(b'+one\r\n+two\r\n')
+
+    server = await asyncio.start_server(handle, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    connection = Connection(reader, writer, loop=event_loop)
+    first = asyncio.ensure_future(connection.send_command('first'))
+    second = asyncio.ensure_future(connection.send_command('second'))
+    responses = await asyncio.wait_for(asyncio.gather(first, second), 1)
+    assert responses == ['one', 'two']
+    connection.close()
+    server.close()
@@ -0,0 +1,50 @@
+import pytest
+from aiodisque import Disque, DedupWindow
+
+
+@pytest.mark.asyncio
+async def test_window(event_loop):
+    window = DedupWindow(ttl=10, maxsize=2, loop=event_loop)
+    calls = []
+
+    async def add(body):
+        calls.append(body)
+        return 'D-%d' % len(calls)
+
+    key = window.key('q', 'foo')
+    assert key == window.key('q', b'foo')
+    assert await window.call(key, add, 'foo') == 'D-1'
+    assert await window.call(key, add, 'foo') == 'D-1'
+    assert window.hits == 1
+    assert window.hit_rate == .5
+
+    await window.call(window.key('q', 'bar'), add, 'bar')
+    await window.call(window.key('q', None, 'baz'), add, 'baz')
+    assert len(window) == 2
+    assert window.evicted == 1
+    assert await window.call(key, add, 'foo') == 'D-4'
+
+
+@pytest.mark.asyncio
+async def test_failure(event_loop):
+    window = DedupWindow(loop=event_loop)
+
+    async def fail():
+        raise ValueError('fail')
+
+    with pytest.raises(ValueError):
+        await window.call('key', fail)
+    assert len(window) == 0
+
+
+@pytest.mark.asyncio
+async def test_addjob(node, event_loop):
+    dedup = DedupWindow(loop=event_loop)
+    client = Disque(node.port, loop=event_loop, dedup=dedup)
+    job_id = await client.addjob('q', 'foo', dedup=True)
+    assert await client.addjob('q', 'foo', dedup=True) == job_id
+    assert await client.addjob('q', 'foo') != job_id
+    key_id = await client.addjob('q', 'bar', idempotency_key='k')
+    assert key_id != job_id
+    assert await client.addjob('q', 'baz', idempotency_key='k') == key_id
+    assert await client.qlen('q') == 3
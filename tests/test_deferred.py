@@ -0,0 +1,108 @@
+import asyncio
+import pytest
+from aiodisque import Disque, DeferredCommands
+from aiodisque.connections import ConnectionError
+from aiodisque.util import CommandTemplate
+
+ADDJOB = CommandTemplate('ADDJOB')
+FASTACK = CommandTemplate('FASTACK')
+
+
+class Client:
+
+    def __init__(self):
+        self.batches = []
+
+    async def execute_messages(self, messages):
+        self.batches.append(messages)
+        await asyncio.sleep(0)
+        return [ConnectionError('ERR bad') if b'bad' in msg else 1
+                for msg in messages]
+
+    async def _execute_addjobs(self, queues, messages, window):
+        self.batches.append(('routed', queues))
+        return ['D-%d' % i for i, queue in enumerate(queues)]
+
+
+@pytest.mark.asyncio
+async def test_pipeline(event_loop):
+    client = Client()
+    errors = []
+    deferred = DeferredCommands(client, max_in_flight=2, loop=event_loop,
+                                on_error=lambda *args: errors.append(args))
+    await deferred.send(FASTACK, 'D-1')
+    await deferred.send(FASTACK, 'bad')
+    assert deferred.in_flight == 2
+    await deferred.send(FASTACK, 'D-3')
+    await deferred.drain()
+    assert len(client.batches) == 2
+    assert len(client.batches[0]) == 2
+    assert deferred.in_flight == 0
+    assert deferred.sent == 3
+    assert deferred.errors == 1
+    assert errors[0][1] == ('FASTACK', 'bad')
+
+
+@pytest.mark.asyncio
+async def test_routing(event_loop):
+    client = Client()
+    deferred = DeferredCommands(client, loop=event_loop)
+    await deferred.send(ADDJOB, 'q', 'job', 0, 'ASYNC')
+    await deferred.send(FASTACK, 'D-1')
+    await deferred.drain()
+    assert ('routed', ['q']) in client.batches
+    assert deferred.errors == 0
+
+
+@pytest.mark.asyncio
+async def test_callbacks(event_loop):
+    client = Client()
+    deferred = DeferredCommands(client, loop=event_loop)
+    called = []
+
+    async def fail():
+        raise ValueError('callback')
+
+    async def succeed():
+        called.append(True)
+
+    await deferred.send(FASTACK, 'D-1', then=fail)
+    await deferred.send(FASTACK, 'D-2', then=succeed)
+    await deferred.send(FASTACK, 'bad', otherwise=succeed)
+    await deferred.drain()
+    assert called == [True, True]
+    assert deferred.errors == 2
+    assert isinstance(deferred.failures[0][0], ValueError)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter(event_loop):
+    client = Client()
+    deferred = DeferredCommands(client, max_in_flight=1, loop=event_loop)
+    deferred.in_flight = 1
+    first = asyncio.ensure_future(deferred.send(FASTACK, 'D-1'))
+    second = asyncio.ensure_future(deferred.send(FASTACK, 'D-2'))
+    await asyncio.sleep(0)
+    deferred.in_flight = 0
+    deferred._wake()
+    # cancelled once woken, before it takes its slot
+    first.cancel()
+    await asyncio.wait_for(second, 1)
+    await deferred.drain()
+    assert deferred.sent == 1
+
+
+@pytest.mark.asyncio
+async def test_client(node, event_loop):
+    client = Disque(node.port, loop=event_loop)
+    for i in range(10):
+        assert await client.addjob('q', 'job', asynchronous=True,
+                                   wait=False) is None
+    await client.deferred.drain()
+    assert await client.qlen('q') == 10
+    jobs = await client.getjob('q', count=10)
+    await client.nack(jobs[0], wait=False)
+    await client.fastack(*jobs[1:], wait=False)
+    await client.deferred.drain()
+    assert client.deferred.errors == 0
+    assert await client.qlen('q') == 1
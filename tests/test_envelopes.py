@@ -0,0 +1,32 @@
+import pytest
+from aiodisque import Disque, Codec, EnvelopeProducer, EnvelopeConsumer
+from aiodisque.envelopes import pack_envelope, unpack_envelope
+
+
+def test_pack():
+    body = pack_envelope([b'foo', b'', b'bar'])
+    messages = unpack_envelope(body.decode('utf-8', 'surrogateescape'))
+    assert all(isinstance(msg, memoryview) for msg in messages)
+    assert [bytes(msg) for msg in messages] == [b'foo', b'', b'bar']
+    assert [bytes(msg) for msg in unpack_envelope('foo')] == [b'foo']
+
+
+@pytest.mark.asyncio
+async def test_envelopes(node, event_loop):
+    client = Disque(node.port, loop=event_loop, codec=Codec('json'))
+    producer = EnvelopeProducer(client, 'q', max_count=3, loop=event_loop)
+    futures = [producer.add_nowait({'n': n}) for n in range(4)]
+    await producer.close()
+    assert producer.envelopes == 2
+    assert futures[0].result() == futures[2].result()
+    assert await client.qlen('q') == 2
+
+    consumer = EnvelopeConsumer(client, 'q')
+    envelope = await consumer.get()
+    assert list(envelope) == [{'n': 0}, {'n': 1}, {'n': 2}]
+    await consumer.complete(envelope, [1])
+    envelope = await consumer.get()
+    assert list(envelope) == [{'n': 3}]
+    await consumer.complete(envelope)
+    envelope = await consumer.get()
+    assert list(envelope) == [{'n': 1}]
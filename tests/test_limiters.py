@@ -0,0 +1,50 @@
+import asyncio
+import pytest
+from aiodisque import Disque, TokenBucket
+
+
+@pytest.mark.asyncio
+async def test_burst(event_loop):
+    bucket = TokenBucket(10, burst=5, loop=event_loop)
+    started = event_loop.time()
+    for i in range(5):
+        await bucket.acquire()
+    assert event_loop.time() - started < .05
+
+    await bucket.acquire()
+    assert event_loop.time() - started >= .09
+
+
+@pytest.mark.asyncio
+async def test_fairness(event_loop):
+    bucket = TokenBucket(100, burst=1, loop=event_loop)
+    await bucket.acquire()
+    served = []
+
+    async def waiter(i):
+        await bucket.acquire()
+        served.append(i)
+
+    await asyncio.gather(*[waiter(i) for i in range(5)])
+    assert served == [0, 1, 2, 3, 4]
+
+
+@pytest.mark.asyncio
+async def test_weight(event_loop):
+    bucket = TokenBucket(1000, per='bytes', loop=event_loop)
+    assert bucket.weight(3, 2048) == 2048
+    started = event_loop.time()
+    await bucket.acquire(2000)
+    assert bucket.tokens < 0
+    await bucket.acquire(0)
+    assert event_loop.time() - started >= .9
+
+
+@pytest.mark.asyncio
+async def test_producer_limiter(node, event_loop):
+    bucket = TokenBucket(20, burst=1, loop=event_loop)
+    client = Disque(node.port, loop=event_loop, producer_limiter=bucket)
+    started = event_loop.time()
+    await client.addjob_many('q', ['job'] * 4)
+    await client.addjob('q', 'job')
+    assert event_loop.time() - started >= .2
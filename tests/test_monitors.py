@@ -0,0 +1,80 @@
+import asyncio
+import pytest
+from aiodisque import Disque, MemoryMonitor
+
+
+@pytest.mark.asyncio
+async def test_sample(node, event_loop):
+    client = Disque(node.port, loop=event_loop)
+    monitor = MemoryMonitor(client, budget=2 ** 40, loop=event_loop)
+    await monitor.sample()
+    assert monitor.used_memory > 0
+    assert monitor.registered_jobs == 0
+    assert monitor.admission == 1
+
+
+@pytest.mark.asyncio
+async def test_throttle(node, event_loop):
+    client = Disque(node.port, loop=event_loop)
+    monitor = MemoryMonitor(client, budget=1, interval=.01, loop=event_loop)
+    await monitor.sample()
+    assert monitor.admission == 0
+
+    client.admission = monitor
+    monitor.budget = 2 ** 40
+    job_id = await client.addjob('q', 'job')
+    assert job_id.startswith('D-')
+    assert monitor.throttled > 0
+    monitor.stop()
+
+
+@pytest.mark.asyncio
+async def test_batch_rate(node, event_loop):
+    client = Disque(node.port, loop=event_loop)
+    monitor = MemoryMonitor(client, budget=2 ** 40, loop=event_loop)
+    await monitor.sample()
+    monitor.budget = monitor.used_memory * 2
+    monitor.threshold = .25
+    await monitor.sample()
+    assert 0 < monitor.batch_rate(1) < 1
+    assert monitor.batch_rate(monitor.used_memory) == 0
+
+
+@pytest.mark.asyncio
+async def test_fail(event_loop):
+    client = Disque('127.0.0.1:1', loop=event_loop)
+
+    async def info():
+        raise OSError('unreachable')
+
+    client.info = info
+    monitor = MemoryMonitor(client, budget=1, interval=.01, max_failures=2,
+                            fail_open=False, loop=event_loop)
+    monitor.used_memory, monitor.admission = 1, 0
+    with pytest.raises(OSError):
+        await monitor.admit()
+    assert monitor.failing
+
+    monitor.fail_open = True
+    monitor.admission = 0
+    monitor.failures = 0
+    await monitor.admit()
+    assert monitor.admission == 1
+    monitor.stop()
+
+
+@pytest.mark.asyncio
+async def test_stop(event_loop):
+    client = Disque('127.0.0.1:1', loop=event_loop)
+
+    async def info():
+        await asyncio.sleep(10)
+
+    client.info = info
+    monitor = MemoryMonitor(client, budget=1, loop=event_loop)
+    monitor.used_memory, monitor.admission = 1, 0
+    producer = asyncio.ensure_future(monitor.admit())
+    await asyncio.sleep(.01)
+    monitor.stop()
+    await asyncio.wait_for(producer, 1)
+    assert monitor.throttled == 1
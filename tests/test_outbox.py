@@ -0,0 +1,84 @@
+import pytest
+from aiodisque import Codec, Disque, Outbox
+from aiodisque.connections import ClosedConnectionError
+
+
+@pytest.mark.asyncio
+async def test_addjob(node, event_loop, tmpdir):
+    client = Disque(node.port, loop=event_loop)
+    outbox = Outbox(client, str(tmpdir.join('spool.db')), loop=event_loop)
+    job_id = await outbox.addjob('q', 'job')
+    assert job_id.startswith('D-')
+    assert outbox.pending() == 0
+    outbox.close()
+
+
+@pytest.mark.asyncio
+async def test_spool(node, event_loop, tmpdir):
+    client = Disque('127.0.0.1:1', loop=event_loop)
+    outbox = Outbox(client, str(tmpdir.join('spool.db')), loop=event_loop,
+                    retry_interval=60)
+    assert await outbox.addjob('q', 'job-1', retry=0) is None
+    assert await outbox.addjob('q', 'job-2') is None
+    assert outbox.pending() == 2
+    outbox.close()
+
+    client = Disque(node.port, loop=event_loop)
+    outbox = Outbox(client, str(tmpdir.join('spool.db')), loop=event_loop,
+                    retry_interval=60)
+    assert outbox.pending() == 2
+    await outbox.drain()
+    assert outbox.pending() == 0
+    assert outbox.replayed == 2
+    assert await client.qlen('q') == 2
+    outbox.close()
+
+
+@pytest.mark.asyncio
+async def test_unknown_options(event_loop, tmpdir):
+    client = Disque('127.0.0.1:1', loop=event_loop)
+    outbox = Outbox(client, str(tmpdir.join('spool.db')), loop=event_loop)
+    with pytest.raises(TypeError):
+        await outbox.addjob('q', 'job', idempotency_key='k')
+    with pytest.raises(TypeError):
+        outbox.spool('q', 'job', wait=False)
+    assert outbox.pending() == 0
+    outbox.close()
+
+
+@pytest.mark.asyncio
+async def test_spool_codec(node, event_loop, tmpdir):
+    client = Disque('127.0.0.1:1', loop=event_loop, codec=Codec('json'))
+    outbox = Outbox(client, str(tmpdir.join('spool.db')), loop=event_loop,
+                    retry_interval=60)
+    assert await outbox.addjob('q', {'a': 1}) is None
+    assert await outbox.addjob('q', [1], codec=Codec('pickle')) is None
+    outbox.close()
+
+    codec = Codec('json', accept=['pickle'])
+    client = Disque(node.port, loop=event_loop, codec=codec)
+    outbox = Outbox(client, str(tmpdir.join('spool.db')), loop=event_loop,
+                    retry_interval=60)
+    await outbox.drain()
+    jobs = await client.getjob('q', count=2)
+    assert [job.body for job in jobs] == [{'a': 1}, [1]]
+    outbox.close()
+
+
+@pytest.mark.asyncio
+async def test_drain_outage(event_loop, tmpdir):
+    client = Disque('127.0.0.1:1', loop=event_loop)
+    outbox = Outbox(client, str(tmpdir.join('spool.db')), loop=event_loop,
+                    retry_interval=60, max_attempts=1)
+
+    async def execute_messages(messages):
+        raise ClosedConnectionError('closed')
+
+    client.execute_messages = execute_messages
+    outbox.spool('q', 'job-1')
+    outbox.spool('q', 'job-2')
+    await outbox.drain()
+    await outbox.drain()
+    assert outbox.pending() == 2
+    assert outbox.dropped == 0
+    outbox.close()
@@ -1,6 +1,9 @@
+import asyncio
+import gc
+import weakref
 import pytest
-from aiodisque import Disque
-from aiodisque.queues import JobsQueue
+from aiodisque import Disque, JobProfile
+from aiodisque.queues import JobsQueue, LengthWatcher, ShardedQueue
 
 
 @pytest.mark.asyncio
@@ -47,3 +50,64 @@ async def test_put_nowait(node, event_loop):
 
     with pytest.raises(NotImplementedError):
         queue.put_nowait('job')
+
+
+@pytest.mark.asyncio
+async def test_put_profile(node, event_loop):
+    client = Disque(node.port, loop=event_loop)
+    profile = JobProfile('q', retry=0)
+    queue = JobsQueue('q', client, loop=event_loop, profile=profile)
+    assert client.profiles['q'] is profile
+    job_id = await queue.put('job')
+    job = await queue.get()
+    assert job.id == job_id
+
+
+@pytest.mark.asyncio
+async def test_put_full(node, event_loop):
+    client = Disque(node.port, loop=event_loop)
+    queue = JobsQueue('q', client, maxsize=1, loop=event_loop)
+    await queue.put('job-1')
+    pending = event_loop.create_task(queue.put('job-2'))
+    await asyncio.sleep(.1)
+    assert not pending.done()
+
+    await queue.get()
+    job_id = await asyncio.wait_for(pending, 2)
+    job = await queue.get()
+    assert job.id == job_id
+    assert LengthWatcher.get(client, 'q').polls > 0
+
+
+@pytest.mark.asyncio
+async def test_sharded(node, event_loop):
+    client = Disque(node.port, loop=event_loop)
+    queue = ShardedQueue('q', client, 3, loop=event_loop)
+    for i in range(3):
+        await queue.put('job-%d' % i)
+    await queue.put('job-3', key='user')
+    await queue.put('job-4', key='user')
+    lengths = [await client.qlen('q:%d' % i) for i in range(3)]
+    assert sorted(lengths) == [1, 1, 3]
+    assert queue.shard('user') is queue.shard('user')
+
+    jobs = [await queue.get() for i in range(5)]
+    assert sorted(job.body for job in jobs) == ['job-%d' % i
+                                               for i in range(5)]
+
+
+def test_shard_keys(event_loop):
+    client = Disque('127.0.0.1:1', loop=event_loop)
+    queue = ShardedQueue('q', client, 3, loop=event_loop)
+    assert queue.shard(42) is queue.shard('42')
+    assert queue.shard(b'user') is queue.shard('user')
+
+
+def test_watcher_registry(event_loop):
+    client = Disque('127.0.0.1:1', loop=event_loop)
+    watcher = LengthWatcher.get(client, 'q', loop=event_loop)
+    assert LengthWatcher.get(client, 'q') is watcher
+    ref = weakref.ref(client)
+    del client, watcher
+    gc.collect()
+    assert ref() is None
@@ -0,0 +1,76 @@
+import pytest
+from aiodisque import Disque, ReplicationPolicy
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 0
+
+    def time(self):
+        return self.now
+
+
+def test_switch():
+    clock = Clock()
+    policy = ReplicationPolicy(.1, tolerant=['q'], smoothing=1, loop=clock)
+    assert policy.adapt('q') == (None, False)
+    policy.record(.5)
+    assert policy.state == 'degraded'
+    assert policy.adapt('q') == (None, True)
+    assert policy.adapt('other', 2) == (2, False)
+    assert policy.degraded_jobs == 1
+
+    policy.record(.05)
+    assert policy.state == 'normal'
+    assert policy.switches == 2
+    assert policy.adapt('q') == (None, False)
+
+
+def test_replicate():
+    clock = Clock()
+    policy = ReplicationPolicy(.1, tolerant=['q'], replicate=1,
+                               smoothing=1, loop=clock)
+    policy.record(.5)
+    assert policy.adapt('q', 3) == (1, False)
+    assert policy.adapt('q') == (1, False)
+    assert policy.adapt('q', 1) == (1, False)
+    assert policy.degraded_jobs == 2
+
+
+def test_probe():
+    clock = Clock()
+    policy = ReplicationPolicy(.1, tolerant=['q'], probe_interval=1,
+                               loop=clock)
+    policy.record(.5)
+    assert policy.adapt('q') == (None, True)
+    clock.now = 1
+    assert policy.adapt('q') == (None, False)
+    assert policy.adapt('q') == (None, True)
+
+
+@pytest.mark.asyncio
+async def test_addjob(node, event_loop):
+    policy = ReplicationPolicy(.1, tolerant=['q'])
+    client = Disque(node.port, loop=event_loop, replication=policy)
+    await client.addjob('q', 'job')
+    assert policy.latency is not None
+    policy.record(10)
+    latency = policy.latency
+    job_id = await client.addjob('q', 'job')
+    assert job_id.startswith('D-')
+    assert policy.degraded_jobs == 1
+    assert policy.latency == latency
+    assert policy.state == 'degraded'
+
+
+@pytest.mark.asyncio
+async def test_profile(node, event_loop):
+    policy = ReplicationPolicy(.1, tolerant=['q'], replicate=1)
+    client = Disque(node.port, loop=event_loop, replication=policy)
+    client.register_profile('q', retry=0, ttl=60)
+    policy.record(10)
+    job = await client.show(await client.addjob('q', 'job'))
+    assert policy.degraded_jobs == 1
+    assert job.retry == 0
+    assert job.ttl <= 60
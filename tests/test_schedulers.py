@@ -0,0 +1,57 @@
+import asyncio
+import pytest
+from aiodisque import Disque, DelayScheduler
+
+
+class Client:
+
+    def __init__(self):
+        self.calls = []
+
+    async def addjob_multi(self, jobs, **options):
+        self.calls.append((jobs, options))
+        return ['D-%s' % job for queue, job in jobs]
+
+
+@pytest.mark.asyncio
+async def test_schedule(event_loop):
+    client = Client()
+    scheduler = DelayScheduler(client, loop=event_loop)
+    second = scheduler.schedule('q', 2, .02)
+    first = scheduler.schedule('q', 1, .01)
+    cancelled = scheduler.schedule('q', 3, .01)
+    cancelled.cancel()
+    assert len(scheduler) == 3
+    assert await first == 'D-1'
+    assert await second == 'D-2'
+    assert client.calls == [([('q', 1)], {}), ([('q', 2)], {})]
+    assert scheduler.added == 2
+
+
+@pytest.mark.asyncio
+async def test_long_delay(event_loop):
+    client = Client()
+    scheduler = DelayScheduler(client, horizon=1, loop=event_loop)
+    await scheduler.addjob('q', 1, 2.01, retry=3)
+    assert client.calls == [([('q', 1)], {'delay': 2, 'retry': 3})]
+
+
+@pytest.mark.asyncio
+async def test_close(event_loop):
+    client = Client()
+    scheduler = DelayScheduler(client, loop=event_loop)
+    future = scheduler.schedule('q', 1, 1.5)
+    await scheduler.close()
+    assert future.result() == 'D-1'
+    assert client.calls == [([('q', 1)], {'delay': 2})]
+
+
+@pytest.mark.asyncio
+async def test_client(node, event_loop):
+    client = Disque(node.port, loop=event_loop)
+    scheduler = DelayScheduler(client, loop=event_loop)
+    future = scheduler.schedule('q', 'job', .1)
+    assert await client.qlen('q') == 0
+    await asyncio.sleep(.2)
+    assert future.done()
+    assert await client.qlen('q') == 1
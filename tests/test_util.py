@@ -1,5 +1,5 @@
 import pytest
-from aiodisque.util import encode_command
+from aiodisque.util import encode_command, encode_arguments, CommandTemplate
 
 def test_encode_command():
     data = encode_command('foo')
@@ -10,3 +10,19 @@ def test_encode_command():
 
     with pytest.raises(TypeError):
         encode_command(None)
+
+
+def test_encode_arguments():
+    data = encode_arguments('foo', 42)
+    assert data == b'$3\r\nfoo\r\n$2\r\n42\r\n'
+    assert encode_command('foo', 42) == b'*2\r\n' + data
+
+
+def test_command_template():
+    template = CommandTemplate('ADDJOB', 'q', suffix=[0, 'ASYNC'])
+    data = template.encode('job')
+    assert data == encode_command('ADDJOB', 'q', 'job', 0, 'ASYNC')
+    assert template.arguments('job') == ('ADDJOB', 'q', 'job', 0, 'ASYNC')
+
+    template = CommandTemplate('ACKJOB')
+    assert template.encode('a', 'b') == encode_command('ACKJOB', 'a', 'b')